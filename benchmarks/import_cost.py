@@ -0,0 +1,67 @@
+"""
+Measure the cost of importing ``nukecontexts`` in fresh interpreters.
+
+Usage:
+
+    $ python benchmarks/import_cost.py
+    $ python benchmarks/import_cost.py --executable /path/to/python --real-nuke
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+CHILD = '''
+import sys
+import json
+import time
+if {fake}:
+    from nukecontexts import testing
+    testing.install()
+before = set(sys.modules)
+start = time.time()
+import nukecontexts
+from nukecontexts import ctx
+elapsed = time.time() - start
+loaded = sorted(set(sys.modules) - before)
+print(json.dumps({{'seconds': elapsed,
+                  'modules': len(loaded),
+                  'tqdm': 'tqdm' in loaded,
+                  'raven': 'raven' in loaded}}))
+'''
+
+
+def measure(executable, fake):
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + [path for path in [env.get('PYTHONPATH')] if path])
+    if fake:
+        env['NON_PRODUCTION_CONTEXT'] = '1'
+    output = subprocess.check_output(
+        [executable, '-c', CHILD.format(fake=fake)], env=env)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--executable', default=sys.executable,
+                        help='Python interpreter (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Fresh interpreters to start, the best is '
+                             'reported (default: %(default)s)')
+    parser.add_argument('--real-nuke', action='store_true',
+                        help='Import the real nuke module instead of '
+                             'nukecontexts.testing')
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.executable, not args.real_nuke)
+            for _ in range(args.repeat)]
+    best = min(runs, key=lambda run: run['seconds'])
+    json.dump(best, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
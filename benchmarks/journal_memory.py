@@ -0,0 +1,201 @@
+"""
+Compare the memory and enter/exit time of the shared undo journal in
+:mod:`nukecontexts.journal` with a ``{node: value}`` dictionary per context,
+for a stack of nested contexts. ``attribute_setter`` measures the full
+:class:`~nukecontexts.ctx.AttributeSetter` for reference.
+
+Memory is the total retained by creating and entering the contexts, measured
+with :mod:`tracemalloc` while all of them are entered: the context objects,
+their saved values, node names and knob handles. The fake ``nuke`` returns a
+new knob wrapper from every lookup, as Nuke does. ``tracemalloc`` requires
+Python 3, under Python 2 only times are reported.
+
+Usage:
+
+    $ python benchmarks/journal_memory.py
+    $ python benchmarks/journal_memory.py --sizes 1000 100000 --depth 8
+"""
+import gc
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+os.environ['NON_PRODUCTION_CONTEXT'] = '1'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from nukecontexts import testing  # noqa: E402
+
+nuke = testing.install()
+
+import nukecontexts  # noqa: E402
+from nukecontexts import ctx  # noqa: E402
+from nukecontexts.journal import get_journal  # noqa: E402
+
+SIZES = [1000, 10000, 100000]
+DEPTH = 4
+ATTRS = ['disable', 'mix', 'white']
+
+log = logging.getLogger('nukecontexts.benchmarks')
+log.addHandler(logging.NullHandler())
+log.propagate = False
+
+
+class DictSetter(object):
+    """
+    Attribute context saving original values in a ``{node: value}``
+    dictionary, as :class:`~nukecontexts.ctx.AttributeSetter` used to.
+    """
+    def __init__(self, nodes, attr, value):
+        self.nodes = nodes
+        self.attr = attr
+        self.value = value
+
+    def __enter__(self):
+        self.enter_values = {}
+        for node in self.nodes:
+            knob = node[self.attr]
+            self.enter_values[node] = knob.value()
+            knob.setValue(self.value)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for node, enter_value in self.enter_values.items():
+            node[self.attr].setValue(enter_value)
+
+
+class JournalSetter(object):
+    """
+    The same context, saving original values in the shared journal and
+    restoring them through a list of the knobs looked up on entry, in the
+    order of the journal.
+    """
+    def __init__(self, nodes, attr, value):
+        self.nodes = nodes
+        self.attr = attr
+        self.value = value
+
+    def __enter__(self):
+        self.saved = get_journal().begin()
+        self.handles = []
+        journal = self.saved.journal
+        for node in self.nodes:
+            knob = node[self.attr]
+            journal.append(node.fullName(), self.attr, knob.value())
+            self.handles.append(knob)
+            knob.setValue(self.value)
+        self.saved.close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for knob, (_, _, enter_value) in zip(reversed(self.handles),
+                                             reversed(self.saved)):
+            knob.setValue(enter_value)
+        self.saved = self.saved.detach()
+        self.handles = None
+
+
+def stack(nodes, depth, factory):
+    values = [False, 0.5, 2.0]
+    return [factory(nodes, ATTRS[level % len(ATTRS)],
+                    values[level % len(ATTRS)])
+            for level in range(depth)]
+
+
+def measure(nodes, depth, factory):
+    """
+    :return: Seconds to enter and exit ``depth`` nested contexts
+    :rtype: float
+    """
+    contexts = stack(nodes, depth, factory)
+    start = time.time()
+    for context in contexts:
+        context.__enter__()
+    for context in reversed(contexts):
+        context.__exit__(None, None, None)
+    return time.time() - start
+
+
+def retained(nodes, depth, factory):
+    """
+    :return: Bytes allocated by creating and entering ``depth`` nested
+             contexts and still held while all are entered, ``None`` without
+             :mod:`tracemalloc`
+    :rtype: int
+    """
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    testing.knob_wrappers = True
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        contexts = stack(nodes, depth, factory)
+        for context in contexts:
+            context.__enter__()
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0] - before
+        for context in reversed(contexts):
+            context.__exit__(None, None, None)
+    finally:
+        tracemalloc.stop()
+        testing.knob_wrappers = False
+    return held
+
+
+def run(sizes, depth, repeat):
+    results = []
+    for size in sizes:
+        testing.clear()
+        nodes = [nuke.createNode('Grade', inpanel=False)
+                 for _ in range(size)]
+        variants = [
+            ('dict', DictSetter),
+            ('journal', JournalSetter),
+            ('attribute_setter',
+             lambda nodes, attr, value: ctx.AttributeSetter(nodes, attr,
+                                                            value, log=log))]
+        for name, factory in variants:
+            seconds = min(measure(nodes, depth, factory)
+                          for _ in range(repeat))
+            memory = retained(nodes, depth, factory)
+            results.append({'representation': name,
+                            'nodes': size,
+                            'depth': depth,
+                            'seconds': seconds,
+                            'bytes': memory})
+            sys.stderr.write('{0:<16} {1:>7} nodes x {2} {3:>10.6f}s '
+                             '{4:>12} bytes\n'.format(name, size, depth,
+                                                      seconds, memory))
+    return {'version': nukecontexts.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='Node counts (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=DEPTH,
+                        help='Nested contexts (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per measurement, the fastest is reported '
+                             '(default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.depth, args.repeat)
+    json.dump(report, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Measure the overhead of ``nukecontexts`` against the in-process fake ``nuke``
+module in :mod:`nukecontexts.testing`.
+
+Usage:
+
+    $ python benchmarks/run_benchmarks.py --output results.json
+    $ python benchmarks/run_benchmarks.py --sizes 10 1000 --latency 0.00001
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+
+os.environ['NON_PRODUCTION_CONTEXT'] = '1'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from nukecontexts import testing  # noqa: E402
+
+nuke = testing.install()
+
+import nukecontexts  # noqa: E402
+from nukecontexts import ctx  # noqa: E402
+
+SIZES = [10, 1000, 10000, 100000]
+LOOPS = 1000
+LOOP_SIZE = 10
+
+log = logging.getLogger('nukecontexts.benchmarks')
+log.addHandler(logging.NullHandler())
+log.propagate = False
+
+
+def populate(size):
+    testing.clear()
+    return [nuke.createNode('Grade', inpanel=False) for _ in range(size)]
+
+
+def timed(function, repeat):
+    """
+    :return: Best wall time of ``repeat`` calls of ``function`` in seconds
+    :rtype: float
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def bench_attribute_setter(nodes):
+    def run():
+        with ctx.AttributeSetter(nodes, 'disable', True, log=log):
+            pass
+    return run
+
+
+def bench_inventory(nodes):
+    def run():
+        with ctx.inventory():
+            for _ in range(10):
+                nuke.createNode('Write', inpanel=False)
+        del testing._nodes[len(nodes):]
+    return run
+
+
+def bench_inventory_diff(nodes):
+    def run():
+        with ctx.inventory(use_callbacks=False):
+            for _ in range(10):
+                nuke.createNode('Write', inpanel=False)
+        del testing._nodes[len(nodes):]
+    return run
+
+
+def bench_multiple_contexts(nodes):
+    def run():
+        contexts = [ctx.AttributeSetter(nodes, 'disable', True, log=log),
+                    ctx.AttributeSetter(nodes, 'mix', 0.5, log=log),
+                    ctx.AttributeSetter(nodes, 'white', 2.0, log=log)]
+        with ctx.multiple_contexts(contexts):
+            pass
+    return run
+
+
+def bench_progress(nodes):
+    def run():
+        with open(os.devnull, 'w') as output:
+            with ctx.Progress(nodes, output=output) as progress:
+                for _ in progress:
+                    pass
+    return run
+
+
+def bench_rebuilt_context(nodes):
+    def run():
+        for _ in range(LOOPS):
+            with ctx.disabled(nodes, log=log):
+                pass
+    return run
+
+
+def bench_reused_context(nodes):
+    def run():
+        context = ctx.disabled(nodes, log=log)
+        for _ in range(LOOPS):
+            with context:
+                pass
+    return run
+
+
+BENCHMARKS = [
+    ('attribute_setter', bench_attribute_setter),
+    ('inventory', bench_inventory),
+    ('inventory_diff', bench_inventory_diff),
+    ('multiple_contexts', bench_multiple_contexts),
+    ('progress', bench_progress),
+]
+
+# Run with LOOP_SIZE nodes, entering a context LOOPS times
+LOOP_BENCHMARKS = [
+    ('rebuilt_context', bench_rebuilt_context),
+    ('reused_context', bench_reused_context),
+]
+
+
+def run(sizes, repeat, latency):
+    nuke.latency.clear()
+    nuke.latency.update(latency)
+    results = []
+    for size in sizes:
+        nodes = populate(size)
+        for name, benchmark in BENCHMARKS:
+            seconds = timed(benchmark(nodes), repeat)
+            results.append({'benchmark': name,
+                            'nodes': size,
+                            'seconds': seconds})
+            sys.stderr.write('{0:<20} {1:>7} nodes {2:>10.6f}s\n'.format(
+                name, size, seconds))
+    nodes = populate(LOOP_SIZE)
+    for name, benchmark in LOOP_BENCHMARKS:
+        seconds = timed(benchmark(nodes), repeat)
+        results.append({'benchmark': name,
+                        'nodes': LOOP_SIZE,
+                        'loops': LOOPS,
+                        'seconds': seconds})
+        sys.stderr.write('{0:<20} {1:>7} loops {2:>10.6f}s\n'.format(
+            name, LOOPS, seconds))
+    return {'version': nukecontexts.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'latency': latency,
+            'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='Node counts (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per benchmark, the best is reported '
+                             '(default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Simulated seconds per value()/setValue() call '
+                             '(default: %(default)s)')
+    parser.add_argument('--output', default='-',
+                        help='JSON results file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    latency = {}
+    if args.latency:
+        latency = {'value': args.latency, 'setValue': args.latency}
+    report = run(args.sizes, args.repeat, latency)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,23 @@ import sys
 import getpass
 import logging
 import platform
+import threading
+
+
+def check_environment():
+    """
+    Raise :class:`RuntimeError` unless running inside Nuke.
+    """
+    if platform.system() == 'Darwin':
+        application = r'Nuke\d+\.\d+v\d+.app'
+    elif platform.system() == 'Windows':
+        application = r'Nuke\d+\.\d+.exe'
+    else:
+        raise RuntimeError('OS {0} is not supported'.format(platform.system()))
+
+    match = re.search(application, sys.executable)
+    if not match:
+        raise RuntimeError('Import nukecontexts from within Nuke')
 
 
 def import_nuke():
@@ -21,55 +38,135 @@ TESTING = False
 try:
     TESTING = os.environ['NON_PRODUCTION_CONTEXT']
     logger = logging.getLogger()
-    sentry = None
-except:
-    if platform.system() == 'Darwin':
-        application = r'Nuke\d+\.\d+v\d+.app'
-    elif platform.system() == 'Windows':
-        application = r'Nuke\d+\.\d+.exe'
-    else:
-        raise RuntimeError('OS {0} is not supported'.format(platform.system()))
+except KeyError:
+    check_environment()
+    logger = logging.getLogger(__name__)
 
-    match = re.search(application, sys.executable)
-    if not match:
-        raise RuntimeError('Import nukecontexts from within Nuke')
-    nuke = import_nuke()
+sentry = None
 
 __version__ = '0.2.0'
-__all__ = ['ctx']
+__all__ = ['cache', 'chunked', 'ctx', 'dag', 'index', 'journal', 'matrix',
+           'metrics', 'parallel', 'reporting', 'runner', 'snapshot', 'spec',
+           'sweep']
 
 
-def create_logger():
-    logger = logging.getLogger(__name__)
-    logger.handlers = []
+try:
+    _replace = os.replace
+except AttributeError:
+    if os.name == 'nt':
+        def _replace(source, destination):
+            # Python 2 on Windows: os.rename fails if destination exists
+            import ctypes
+            encoding = sys.getfilesystemencoding()
+            source, destination = [path.decode(encoding)
+                                   if isinstance(path, bytes) else path
+                                   for path in (source, destination)]
+            # MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH
+            if not ctypes.windll.kernel32.MoveFileExW(source, destination,
+                                                      0x1 | 0x8):
+                raise ctypes.WinError()
+    else:
+        _replace = os.rename
+
+
+def atomic_write(path, data):
+    """
+    Write ``data`` to a temporary file next to ``path`` and move it over
+    ``path`` in a single step, so readers see either the old or the new file,
+    on Windows too.
+
+    :param path: File path
+    :type path: str
+    :param data: File contents
+    :type data: str
+    """
+    tmp_path = '{0}.{1}.{2}.tmp'.format(path, os.getpid(),
+                                        threading.current_thread().ident)
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def stdout_handler():
+    """
+    :return: Handler writing formatted records to ``stdout``
+    :rtype: logging.StreamHandler
+    """
     handler = logging.StreamHandler(stream=sys.stdout)
     formatter = logging.Formatter(fmt='%(asctime)s: %(name)s: '
                                       '%(levelname)s: %(message)s',
                                   datefmt='%d/%m/%Y %I:%M:%S')
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    return handler
+
+
+def create_logger():
+    logger = logging.getLogger(__name__)
+    logger.handlers = [stdout_handler()]
     logger.setLevel(logging.INFO)
     logger.propagate = False
     return logger
 
 
+class DeferredHandler(logging.Handler):
+    """
+    Placeholder handler that replaces itself with :func:`stdout_handler` in
+    the handlers of its logger when the first record is logged. The logger's
+    level and other handlers are left as they are.
+    """
+    def __init__(self, logger_name=__name__):
+        logging.Handler.__init__(self)
+        self.logger_name = logger_name
+        self.replacement = None
+
+    def emit(self, record):
+        if self.replacement is None:
+            self.replacement = stdout_handler()
+            log = logging.getLogger(self.logger_name)
+            log.handlers = [self.replacement if handler is self else handler
+                            for handler in log.handlers]
+        self.replacement.handle(record)
+
+
 def get_sentry():
+    """
+    Create the `Sentry <http://sentry.io/>`_ client on first use. The client
+    is never created on import; this is the accessor for it, and
+    ``nukecontexts.sentry`` stays ``None`` until it has been called.
+
+    :return: Sentry client or ``None`` if Raven is not installed or
+             ``SENTRY_DSN`` is not set
+    :rtype: raven.Client
+    """
+    global sentry
+    if sentry is not None:
+        return sentry
     try:
         from raven import Client
         try:
             os.environ['SENTRY_DSN']
         except KeyError:
             raise ImportError
+        nuke = import_nuke()
         client = Client(release=__version__)
         client.user_context({'username': getpass.getuser()})
         client.tags_context({
                 'os_version': platform.platform(),
                 'nuke_version': nuke.NUKE_VERSION_STRING})
+        sentry = client
         return client
     except ImportError:
         return None
 
 
 if not TESTING:
-    logger = create_logger()
-    sentry = get_sentry()
+    logger.handlers = [DeferredHandler()]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
@@ -0,0 +1,5 @@
+import sys
+
+from nukecontexts.runner import main
+
+sys.exit(main())
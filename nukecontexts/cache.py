@@ -0,0 +1,248 @@
+"""
+Render cache for :func:`nuke.execute`, keyed by the effective state of every
+node upstream of the rendered Write node.
+
+Usage:
+
+>>> cache = RenderCache('/path/to/cache.json', max_entries=500)
+>>> with ctx.set_attr(grade, 'white', 2.0):
+>>>     cache.execute(write, 1, 100)
+>>> cache.stats
+"""
+import os
+import re
+import json
+import time
+import hashlib
+
+from nukecontexts import atomic_write, dag, import_nuke, logger
+
+nuke = import_nuke()
+
+#: Knobs that don't affect the rendered result and are left out of the key
+IGNORED_KNOBS = frozenset(['xpos', 'ypos', 'selected', 'tile_color',
+                           'gl_color', 'note_font', 'note_font_size',
+                           'note_font_color', 'hide_input', 'postage_stamp',
+                           'bookmark', 'indicators', 'icon'])
+
+#: Root knobs that don't affect the rendered result and are left out of the
+#: key
+IGNORED_ROOT_KNOBS = frozenset(['name', 'frame', 'first_frame', 'last_frame',
+                                'lock_range', 'lock_connections', 'label'])
+
+FRAME_PATTERN = re.compile(r'%0?(\d*)d|(#+)')
+
+
+def frame_path(path, frame):
+    """
+    :param path: File path with ``%04d`` or ``####`` frame placeholders
+    :type path: str
+    :param frame: Frame number
+    :type frame: int
+    :return: Path of ``frame``
+    :rtype: str
+    """
+    def replace(match):
+        if match.group(2):
+            width = len(match.group(2))
+        else:
+            width = int(match.group(1) or 0)
+        return str(frame).zfill(width)
+    return FRAME_PATTERN.sub(replace, path)
+
+
+def output_files(write, first, last, incr=1):
+    """
+    :param write: Write node
+    :type write: :class:`~nuke.Node`
+    :return: Files written by rendering ``write`` from ``first`` to ``last``,
+             from its evaluated file name
+    :rtype: list
+    """
+    path = nuke.filename(write)
+    if not path:
+        return []
+    return [frame_path(path, frame)
+            for frame in range(first, last + 1, incr)]
+
+
+def file_stats(paths):
+    """
+    :param paths: File paths
+    :type paths: list
+    :return: ``{path: [mtime, size]}``, ``None`` if any file is missing
+    :rtype: dict
+    """
+    stats = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stats[path] = [stat.st_mtime, stat.st_size]
+    return stats
+
+
+def state_key(write, first, last, incr=1):
+    """
+    Hash the knob values and connections of every node upstream of
+    ``write``, including the nodes inside upstream groups, as they are under
+    the currently entered contexts, together with the Root knobs (format,
+    fps, color management, ...), the evaluated output file name and the
+    frame range.
+
+    :param write: Write node
+    :type write: :class:`~nuke.Node`
+    :return: Hex digest
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    digest.update('{0} {1} {2}\n'.format(first, last, incr).encode('utf-8'))
+    line = 'output {0}\n'.format(nuke.filename(write))
+    digest.update(line.encode('utf-8'))
+    for name, knob in sorted(nuke.root().knobs().items()):
+        if name in IGNORED_ROOT_KNOBS or name in IGNORED_KNOBS:
+            continue
+        line = 'root {0} {1}\n'.format(name, knob.toScript())
+        digest.update(line.encode('utf-8'))
+    for node in sorted(dag.upstream(write), key=lambda node: node.fullName()):
+        line = '{0} {1}\n'.format(node.fullName(), node.Class())
+        digest.update(line.encode('utf-8'))
+        for index in range(node.inputs()):
+            upstream = node.input(index)
+            name = upstream.fullName() if upstream is not None else ''
+            line = 'input {0} {1}\n'.format(index, name)
+            digest.update(line.encode('utf-8'))
+        for name, knob in sorted(node.knobs().items()):
+            if name in IGNORED_KNOBS:
+                continue
+            line = '{0} {1}\n'.format(name, knob.toScript())
+            digest.update(line.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RenderCache(object):
+    """
+    Skip :func:`nuke.execute` when a Write node has already been rendered
+    with the same upstream state and frame range and its output files are
+    unchanged since, by modification time and size. Rendering drops every
+    entry sharing output files with the render.
+
+    The cache index is stored as JSON at ``path``. Entries are evicted once
+    they are older than ``max_age`` seconds or, least recently used first,
+    once there are more than ``max_entries``.
+    """
+    def __init__(self, path, max_entries=1000, max_age=None, log=logger):
+        """
+        :param path: Cache index file
+        :type path: str
+        :param max_entries: Maximum number of entries (default: 1000)
+        :type max_entries: int
+        :param max_age: Maximum entry age in seconds (default: None)
+        :type max_age: float
+        :param log: Logger
+        :type log: logging.Logger
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.log = log
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        """
+        Atomically write the cache index.
+        """
+        atomic_write(self.path, json.dumps(self.entries, sort_keys=True))
+
+    def evict(self, now=None):
+        """
+        Drop expired entries and the least recently used entries above
+        ``max_entries``.
+        """
+        now = now or time.time()
+        expired = [key for key, entry in self.entries.items()
+                   if self.max_age is not None and
+                   now - entry['created'] > self.max_age]
+        by_use = sorted((entry['used'], key)
+                        for key, entry in self.entries.items()
+                        if key not in expired)
+        excess = max(0, len(by_use) - self.max_entries)
+        for key in expired + [key for _, key in by_use[:excess]]:
+            del self.entries[key]
+            self.stats['evictions'] += 1
+
+    def lookup(self, key):
+        """
+        :param key: State key, see :func:`state_key`
+        :type key: str
+        :return: Cache entry if it is valid and all its files are unchanged
+        :rtype: dict
+        """
+        self.evict()
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        files = entry['files']
+        if not isinstance(files, dict) or file_stats(files) != files:
+            del self.entries[key]
+            return None
+        return entry
+
+    def discard(self, files):
+        """
+        Drop every entry with any of ``files`` among its output files.
+
+        :param files: File paths
+        :type files: list
+        """
+        files = set(files)
+        for key, entry in list(self.entries.items()):
+            if files.intersection(entry['files']):
+                del self.entries[key]
+
+    def execute(self, write, first, last, incr=1):
+        """
+        Render ``write`` with :func:`nuke.execute` unless an identical render
+        is cached.
+
+        :param write: Write node
+        :type write: :class:`~nuke.Node`
+        :param first: First frame
+        :type first: int
+        :param last: Last frame
+        :type last: int
+        :param incr: Frame increment (default: 1)
+        :type incr: int
+        :return: Whether ``write`` was rendered
+        :rtype: bool
+        """
+        key = state_key(write, first, last, incr)
+        now = time.time()
+        entry = self.lookup(key)
+        if entry is not None:
+            entry['used'] = now
+            self.stats['hits'] += 1
+            self.log.info('Render cache hit: %s %s-%s', write.name(), first,
+                          last)
+            self.save()
+            return False
+        self.stats['misses'] += 1
+        files = output_files(write, first, last, incr)
+        self.discard(files)
+        nuke.execute(write.name(), first, last, incr)
+        stats = file_stats(files)
+        if stats is not None:
+            self.entries[key] = {'write': write.fullName(),
+                                 'first': first,
+                                 'last': last,
+                                 'files': stats,
+                                 'created': now,
+                                 'used': now}
+        self.evict(now)
+        self.save()
+        return True
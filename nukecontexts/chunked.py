@@ -0,0 +1,244 @@
+"""
+Render a frame range in chunks, checkpointing finished chunks so that an
+interrupted render resumes where it stopped.
+
+Usage:
+
+>>> with ctx.set_attr(grade, 'white', 2.0):
+>>>     chunked.execute(write, 1, 1000, chunk_size=50,
+>>>                     checkpoint='/tmp/shot010.chunks.json')
+
+>>> job = parallel.describe(contexts, write, 1, 1000)
+>>> chunked.render(job, chunk_size=50, workers=8,
+>>>                checkpoint='/tmp/shot010.chunks.json')
+"""
+import os
+import sys
+import json
+import hashlib
+from contextlib import contextmanager
+
+from nukecontexts import (atomic_write, cache, import_nuke, logger,
+                          parallel)
+from nukecontexts.ctx import Progress
+
+nuke = import_nuke()
+
+
+def frame_chunks(first, last, chunk_size):
+    """
+    :param first: First frame
+    :type first: int
+    :param last: Last frame
+    :type last: int
+    :param chunk_size: Frames per chunk
+    :type chunk_size: int
+    :return: ``(first, last)`` tuples covering the frame range in order
+    :rtype: list
+    """
+    if chunk_size < 1:
+        raise ValueError('Chunk size must be at least 1')
+    return [(start, min(start + chunk_size - 1, last))
+            for start in range(first, last + 1, chunk_size)]
+
+
+class Checkpoint(object):
+    """
+    Finished chunks of a render, stored as JSON at ``path``. The checkpoint
+    only applies to the render identified by ``key``; a checkpoint left by a
+    different render is ignored and overwritten.
+    """
+    def __init__(self, path, key):
+        """
+        :param path: Checkpoint file
+        :type path: str
+        :param key: Render identifier
+        :type key: str
+        """
+        self.path = path
+        self.key = key
+        self.finished = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('key') == key:
+                self.finished = set(tuple(chunk) for chunk in data['chunks'])
+
+    def __contains__(self, chunk):
+        return tuple(chunk) in self.finished
+
+    def mark(self, chunk):
+        """
+        Record ``chunk`` as finished and save the checkpoint.
+
+        :param chunk: ``(first, last)`` tuple
+        :type chunk: tuple
+        """
+        self.finished.add(tuple(chunk))
+        self.save()
+
+    def save(self):
+        """
+        Atomically write the checkpoint file.
+        """
+        atomic_write(self.path, json.dumps({'key': self.key,
+                                            'chunks': sorted(self.finished)}))
+
+    def remove(self):
+        """
+        Delete the checkpoint file, once the whole render has finished.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@contextmanager
+def _progress(name, frames, enabled, output):
+    if not enabled:
+        yield None
+        return
+    with Progress(None, name=name, output=output, total=frames,
+                  unit='frame') as bar:
+        yield bar
+
+
+def _frames(chunk):
+    return chunk[1] - chunk[0] + 1
+
+
+def execute(write, first, last, chunk_size=10, checkpoint=None,
+            progress=False, output=sys.stdout, log=logger):
+    """
+    Render ``write`` in the current session with :func:`nuke.execute`, one
+    chunk of frames at a time, in the state set up by the currently entered
+    contexts.
+
+    With a ``checkpoint`` file, finished chunks are recorded and skipped when
+    the same render is started again in the same state. The checkpoint is
+    removed once every chunk has been rendered.
+
+    :param write: Write node
+    :type write: :class:`~nuke.Node`
+    :param first: First frame
+    :type first: int
+    :param last: Last frame
+    :type last: int
+    :param chunk_size: Frames per chunk (default: 10)
+    :type chunk_size: int
+    :param checkpoint: Checkpoint file (default: None)
+    :type checkpoint: str
+    :param progress: Show a progress bar in frames/s (default: False)
+    :type progress: bool
+    :param output: Progress bar output stream (default: ``sys.stdout``)
+    :type output: io.TextIOWrapper or io.StringIO
+    :param log: Logger
+    :type log: logging.Logger
+    :return: Chunks rendered, without those skipped
+    :rtype: list
+    """
+    chunks = frame_chunks(first, last, chunk_size)
+    state = None
+    if checkpoint is not None:
+        state = Checkpoint(checkpoint, cache.state_key(write, first, last))
+    pending = [chunk for chunk in chunks
+               if state is None or chunk not in state]
+    if len(pending) < len(chunks):
+        log.info('Resuming %s: %d of %d chunk(s) finished', write.name(),
+                 len(chunks) - len(pending), len(chunks))
+    frames = sum(_frames(chunk) for chunk in pending)
+    with _progress(write.name(), frames, progress, output) as bar:
+        for chunk in pending:
+            nuke.execute(write.name(), chunk[0], chunk[1], 1)
+            if state is not None:
+                state.mark(chunk)
+            if bar is not None:
+                bar.update(_frames(chunk))
+    if state is not None:
+        state.remove()
+    return pending
+
+
+def split(job, chunk_size):
+    """
+    :param job: Job description, see :func:`~nukecontexts.parallel.describe`
+    :type job: dict
+    :param chunk_size: Frames per chunk
+    :type chunk_size: int
+    :return: One job description per chunk of frames
+    :rtype: list
+    """
+    jobs = []
+    for first, last in frame_chunks(job['first'], job['last'], chunk_size):
+        chunk = dict(job)
+        chunk['first'] = first
+        chunk['last'] = last
+        jobs.append(chunk)
+    return jobs
+
+
+def job_key(job):
+    """
+    :param job: Job description
+    :type job: dict
+    :return: Hex digest identifying the render of ``job``
+    :rtype: str
+    """
+    return hashlib.sha1(json.dumps(job, sort_keys=True).encode(
+        'utf-8')).hexdigest()
+
+
+def render(job, chunk_size=10, workers=4, checkpoint=None, progress=False,
+           output=sys.stdout, log=logger, **kwargs):
+    """
+    Render a job description in chunks of frames on a pool of headless
+    workers, see :func:`~nukecontexts.parallel.render`.
+
+    With a ``checkpoint`` file, chunks are recorded as their workers finish
+    successfully and skipped when the same job is rendered again. The
+    checkpoint is removed once every chunk has been rendered.
+
+    :param job: Job description, see :func:`~nukecontexts.parallel.describe`
+    :type job: dict
+    :param chunk_size: Frames per chunk (default: 10)
+    :type chunk_size: int
+    :param workers: Number of worker processes (default: 4)
+    :type workers: int
+    :param checkpoint: Checkpoint file (default: None)
+    :type checkpoint: str
+    :param progress: Show a progress bar in frames/s (default: False)
+    :type progress: bool
+    :param output: Progress bar output stream (default: ``sys.stdout``)
+    :type output: io.TextIOWrapper or io.StringIO
+    :param log: Logger
+    :type log: logging.Logger
+    :param kwargs: Further arguments of
+                   :func:`~nukecontexts.parallel.render`
+    :return: Results of the chunks rendered, without those skipped
+    :rtype: list
+    """
+    jobs = split(job, chunk_size)
+    state = None
+    if checkpoint is not None:
+        state = Checkpoint(checkpoint, job_key(job))
+    pending = [chunk for chunk in jobs if state is None or
+               (chunk['first'], chunk['last']) not in state]
+    if len(pending) < len(jobs):
+        log.info('Resuming %s: %d of %d chunk(s) finished', job['write'],
+                 len(jobs) - len(pending), len(jobs))
+    frames = sum(_frames((chunk['first'], chunk['last'])) for chunk in pending)
+    with _progress(job['write'], frames, progress, output) as bar:
+        def finished(result):
+            if result.returncode:
+                return
+            chunk = (result.job['first'], result.job['last'])
+            if state is not None:
+                state.mark(chunk)
+            if bar is not None:
+                bar.update(_frames(chunk))
+
+        results = parallel.render(pending, workers=workers,
+                                  callback=finished, log=log, **kwargs)
+    if state is not None and all(not result.returncode
+                                 for result in results):
+        state.remove()
+    return results
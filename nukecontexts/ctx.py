@@ -1,12 +1,22 @@
 import sys
+import time
+import numbers
+import logging
+import threading
 from contextlib import contextmanager
 
-from tqdm import tqdm
-
-from nukecontexts import import_nuke, logger
+from nukecontexts import dag, import_nuke, logger, metrics, reporting
+from nukecontexts.index import Selection
+from nukecontexts.journal import Journal, Segment, get_journal
+from nukecontexts.snapshot import Snapshot
 
 nuke = import_nuke()
 
+try:
+    string_types = (basestring,)
+except NameError:
+    string_types = (str,)
+
 
 class NukeContextError(ValueError):
     def __init__(self, message, *args):
@@ -14,6 +24,114 @@ class NukeContextError(ValueError):
         super(NukeContextError, self).__init__(message, *args)
 
 
+def _is_int(value):
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _is_numbers(value):
+    if isinstance(value, (list, tuple)):
+        return all(_is_number(item) for item in value)
+    return _is_number(value)
+
+
+#: Value checks by knob class, knob classes not listed accept any value
+VALUE_CHECKS = {
+    'Boolean_Knob': (lambda value: isinstance(value, numbers.Integral),
+                     'a bool'),
+    'Enumeration_Knob': (lambda value: isinstance(value, string_types) or
+                         _is_int(value),
+                         'a string or an int'),
+    'Int_Knob': (_is_int, 'an int'),
+    'Double_Knob': (_is_numbers, 'a number'),
+    'Array_Knob': (_is_numbers, 'a number or a list of numbers'),
+    'XY_Knob': (_is_numbers, 'a number or a list of numbers'),
+    'XYZ_Knob': (_is_numbers, 'a number or a list of numbers'),
+    'WH_Knob': (_is_numbers, 'a number or a list of numbers'),
+    'Color_Knob': (_is_numbers, 'a number or a list of numbers'),
+    'AColor_Knob': (_is_numbers, 'a number or a list of numbers'),
+    'String_Knob': (lambda value: isinstance(value, string_types),
+                    'a string'),
+    'File_Knob': (lambda value: isinstance(value, string_types), 'a string'),
+}
+
+
+def validate_value(knob, attr, value):
+    """
+    Raise :class:`NukeContextError` if ``value`` can't be set on ``knob``.
+
+    :param knob: Knob
+    :type knob: :class:`~nuke.Knob`
+    :param attr: Attribute
+    :type attr: str
+    :param value: Value
+    :type value: str, int, float, bool, list
+    """
+    try:
+        check, expected = VALUE_CHECKS[knob.Class()]
+    except KeyError:
+        return
+    if not check(value):
+        raise NukeContextError('Attribute \'{0}\': expected {1}, got '
+                               '{2!r}'.format(attr, expected, value))
+
+
+def as_list(nodes):
+    """
+    :param nodes: Node, list of nodes or :class:`~nukecontexts.index.Selection`
+    :type nodes: :class:`~nuke.Node`, list or
+                 :class:`~nukecontexts.index.Selection`
+    :return: Nodes
+    :rtype: list
+    """
+    if isinstance(nodes, Selection):
+        return nodes.nodes()
+    if not isinstance(nodes, list):
+        return [nodes]
+    return nodes
+
+
+def in_main_thread():
+    """
+    :return: Whether the calling thread is the main thread
+    :rtype: bool
+    """
+    try:
+        return threading.current_thread() is threading.main_thread()
+    except AttributeError:
+        return isinstance(threading.current_thread(), threading._MainThread)
+
+
+def _capture(function, args):
+    try:
+        return function(*args), None
+    except Exception as err:
+        return None, err
+
+
+def run_in_main_thread(function, *args):
+    """
+    Call ``function`` in Nuke's main thread with a single
+    :func:`nuke.executeInMainThreadWithResult` round trip and return its
+    result. Exceptions are raised again in the calling thread. From the main
+    thread, ``function`` is called directly.
+
+    :param function: Callable
+    :type function: callable
+    :return: Result of ``function``
+    """
+    if in_main_thread():
+        return function(*args)
+    result, error = nuke.executeInMainThreadWithResult(_capture,
+                                                       args=(function, args))
+    if error is not None:
+        raise error
+    return result
+
+
 class Progress(object):
     """
     Convenience wrapper class around :func:`tqdm.tqdm` for easy progress bars
@@ -23,8 +141,15 @@ class Progress(object):
     >>> with Progress(iterable) as progress:
     >>>    for item in progress:
     >>>        #do something
+
+    Without an iterable, pass a ``total`` and update the bar manually, e.g.
+    with the number of frames rendered, to show a rate in frames/s:
+
+    >>> with Progress(None, total=100, unit='frame') as progress:
+    >>>    progress.update(10)
     """
-    def __init__(self, iterable, name='nukecontexts', output=sys.stdout):
+    def __init__(self, iterable, name='nukecontexts', output=sys.stdout,
+                 total=None, unit='it'):
         """
         :param interable: Iterable to generate progress bar for
         :type interable: iter
@@ -32,77 +157,323 @@ class Progress(object):
         :type name: str
         :param output: Output stream (default: ``sys.stdout``)
         :type output: io.TextIOWrapper or io.StringIO
+        :param total: Expected number of units (default: None)
+        :type total: int
+        :param unit: Unit of the rate shown (default: 'it')
+        :type unit: str
         """
         self.name = name
         self.iterable = iterable
         self.output = output
+        self.total = total
+        self.unit = unit
 
     def __enter__(self):
         """
         :return: Progress bar
         :rtype: tqdm.tqdm
         """
-        return tqdm(iterable=self.iterable,
-                    desc=self.name,
-                    file=self.output)
+        from tqdm import tqdm
+        self.start = time.time()
+        self.bar = tqdm(iterable=self.iterable,
+                        desc=self.name,
+                        file=self.output,
+                        total=self.total,
+                        unit=self.unit)
+        return self.bar
 
     def __exit__(self, exc_type, exc_value, traceback):
-        pass
+        self.bar.close()
+        if metrics.enabled():
+            metrics.record('progress', time.time() - self.start,
+                           name=self.name)
 
 
-@contextmanager
-def inventory(var):
+class FrameProgress(object):
     """
-    Given a variable name, create a node inventory on entry and a separate node
-    inventory on exit and save any new nodes into the newly created variable.
+    Progress bars for a batch of renders, driven by Nuke's
+    ``beforeFrameRender`` and ``afterFrameRender`` callbacks. The outer bar
+    counts the frames of the whole batch and shows the overall frames/s and
+    ETA, the inner bar counts the frames of the current variant.
 
-    Beware that the new variable is created in ``__builtins__`` and is
-    therefore accessible even after the context manager has exited.
+    Without a TTY, e.g. on the farm, one progress line is logged at most
+    every ``log_interval`` seconds instead.
+
+    Usage:
+
+    >>> with FrameProgress(variants, frames=100) as progress:
+    >>>    for variant in progress:
+    >>>        with variant:
+    >>>            nuke.execute(write.name(), 1, 100, 1)
+    """
+    def __init__(self, variants, frames, total=None, name='nukecontexts',
+                 output=sys.stdout, mininterval=0.5, log_interval=30.0,
+                 log=logger):
+        """
+        :param variants: Variants, e.g. attribute contexts or matrix variants
+        :type variants: iter
+        :param frames: Frames rendered per variant
+        :type frames: int
+        :param total: Number of variants (default: ``len(variants)``)
+        :type total: int
+        :param name: Progress bar label (default: 'nukecontexts')
+        :type name: str
+        :param output: Output stream (default: ``sys.stdout``)
+        :type output: io.TextIOWrapper or io.StringIO
+        :param mininterval: Minimum seconds between bar refreshes
+                            (default: 0.5)
+        :type mininterval: float
+        :param log_interval: Minimum seconds between progress lines without
+                             a TTY (default: 30.0)
+        :type log_interval: float
+        :param log: Logger
+        :type log: logging.Logger
+        """
+        if total is None:
+            total = len(variants)
+        self.variants = variants
+        self.frames = frames
+        self.total = total
+        self.name = name
+        self.output = output
+        self.mininterval = mininterval
+        self.log_interval = log_interval
+        self.log = log
+        self.rendered = 0
+
+    def __enter__(self):
+        """
+        :return: Variants, with the inner bar reset for every variant
+        :rtype: generator
+        """
+        self.start = self.reported = time.time()
+        self.rendered = 0
+        self.variant = 0
+        self.frame_start = None
+        self.outer = self.inner = None
+        if getattr(self.output, 'isatty', lambda: False)():
+            from tqdm import tqdm
+            self.outer = tqdm(total=self.total * self.frames, desc=self.name,
+                              file=self.output, unit='frame',
+                              mininterval=self.mininterval, position=0)
+            self.inner = tqdm(total=self.frames, file=self.output,
+                              unit='frame', mininterval=self.mininterval,
+                              position=1, leave=False)
+        nuke.addBeforeFrameRender(self._before_frame)
+        nuke.addAfterFrameRender(self._after_frame)
+        return self._iterate()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        nuke.removeBeforeFrameRender(self._before_frame)
+        nuke.removeAfterFrameRender(self._after_frame)
+        if self.outer is not None:
+            self.inner.close()
+            self.outer.close()
+        elapsed = time.time() - self.start
+        self.log.info('%s: rendered %d frame(s) in %.2fs', self.name,
+                      self.rendered, elapsed)
+        if metrics.enabled():
+            metrics.record('progress', elapsed, name=self.name)
+
+    def _iterate(self):
+        for index, variant in enumerate(self.variants):
+            self.variant = index
+            if self.inner is not None:
+                self.inner.reset()
+                self.inner.set_description(
+                    '{0}/{1}'.format(index + 1, self.total), refresh=False)
+            yield variant
+
+    def _before_frame(self):
+        self.frame_start = time.time()
+
+    def _after_frame(self):
+        self.rendered += 1
+        if self.outer is not None:
+            self.outer.update(1)
+            self.inner.update(1)
+        else:
+            now = time.time()
+            if now - self.reported >= self.log_interval:
+                self.reported = now
+                self.log.info('%s', self.status(now))
+        if self.frame_start is not None and metrics.enabled():
+            metrics.record('frame', time.time() - self.frame_start,
+                           name=self.name)
+
+    def status(self, now=None):
+        """
+        :return: Progress line with the overall frames/s and ETA
+        :rtype: str
+        """
+        now = now or time.time()
+        frames = self.total * self.frames
+        elapsed = now - self.start
+        rate = self.rendered / elapsed if elapsed > 0 else 0.0
+        if rate:
+            eta = '{0:.0f}s'.format((frames - self.rendered) / rate)
+        else:
+            eta = '?'
+        return '{0}: variant {1}/{2}, frame {3}/{4}, {5:.2f} frames/s, ' \
+               'ETA {6}'.format(self.name, self.variant + 1, self.total,
+                                self.rendered, frames, rate, eta)
+
+
+class Inventory(object):
+    def __init__(self, var=None, recurse=False, callback=None,
+                 use_callbacks=True):
+        """
+        Collect all nodes (:class:`~nuke.Node`) created while the context is
+        entered. The list of new nodes is returned on entry and filled on exit.
+
+        By default creations are recorded incrementally through Nuke's
+        ``onCreate`` callback. With ``use_callbacks=False`` the node graph is
+        diffed on exit instead, using a set of the nodes present on entry.
+
+        :param var: Variable name to save new nodes into in ``__builtins__``
+                    (default: None)
+        :type var: str
+        :param recurse: Include nodes created inside groups (default: False)
+        :type recurse: bool
+        :param callback: Callable receiving the list of new nodes on exit
+                         (default: None)
+        :type callback: callable
+        :param use_callbacks: Record creations through ``onCreate`` instead of
+                              diffing the node graph (default: True)
+        :type use_callbacks: bool
+        """
+        self.var = var
+        self.recurse = recurse
+        self.callback = callback
+        self.use_callbacks = use_callbacks
+
+    def _all_nodes(self):
+        if self.recurse:
+            return nuke.allNodes(recurseGroups=True)
+        return nuke.allNodes()
+
+    def _created(self):
+        if self.recurse or nuke.thisParent() == self.group:
+            self.created.append(nuke.thisNode())
+
+    def __enter__(self):
+        """
+        :return: New nodes, filled on exit
+        :rtype: list
+        """
+        self.nodes = []
+        mode = 'callbacks' if self.use_callbacks else 'diff'
+        with metrics.timer('inventory_enter', mode=mode):
+            if self.use_callbacks:
+                self.created = []
+                self.group = nuke.thisGroup()
+                nuke.addOnCreate(self._created)
+            else:
+                self.before = set(self._all_nodes())
+        return self.nodes
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        mode = 'callbacks' if self.use_callbacks else 'diff'
+        with metrics.timer('inventory_exit', mode=mode):
+            if self.use_callbacks:
+                nuke.removeOnCreate(self._created)
+                self.nodes.extend(node for node in self.created
+                                  if _is_alive(node))
+            else:
+                self.nodes.extend(node for node in self._all_nodes()
+                                  if node not in self.before)
+        if self.var:
+            __builtins__[self.var] = self.nodes
+        if self.callback:
+            self.callback(self.nodes)
+
+
+def _is_alive(node):
+    try:
+        node.name()
+    except ValueError:
+        return False
+    return True
+
+
+def inventory(var=None, recurse=False, callback=None, use_callbacks=True):
+    """
+    Collect all nodes created inside the context. See :class:`Inventory`.
+
+    Given a variable name, any new nodes are saved into the newly created
+    variable. Beware that the new variable is created in ``__builtins__`` and
+    is therefore accessible even after the context manager has exited.
 
     **Use with namespace in mind!**
 
-    :param var: Variable name
+    Without a variable name, use the list returned on entry instead:
+
+    >>> with inventory() as new_nodes:
+    >>>     nuke.createNode('Write')
+    >>> print new_nodes
+
+    :param var: Variable name (default: None)
     :type var: str
+    :param recurse: Include nodes created inside groups (default: False)
+    :type recurse: bool
+    :param callback: Callable receiving the list of new nodes on exit
+                     (default: None)
+    :type callback: callable
+    :param use_callbacks: Record creations through ``onCreate`` instead of
+                          diffing the node graph (default: True)
+    :type use_callbacks: bool
+    :rtype: Inventory
     """
-    import nuke
-    before = nuke.allNodes()
-    yield
-    after = nuke.allNodes()
-    __builtins__[var] = [node for node in after if node not in before]
+    return Inventory(var=var, recurse=recurse, callback=callback,
+                     use_callbacks=use_callbacks)
 
 
 @contextmanager
-def enabled(nodes, log=logger):
+def preserved(nodes):
+    """
+    Given a list of nodes (:class:`~nuke.Node`), capture their full state on
+    entry and restore it on exit, including animation curves and expressions.
+    See :class:`~nukecontexts.snapshot.Snapshot`.
+
+    :param nodes: Nodes
+    :type nodes: list
+    """
+    snapshot = Snapshot.capture(as_list(nodes))
+    try:
+        yield snapshot
+    finally:
+        snapshot.restore()
+
+
+def enabled(nodes, **kwargs):
     """
     Given a list of nodes (:class:`~nuke.Node`), enable on entry and restore
     to original value on exit.
 
     :param nodes: Nodes
     :type nodes: list
-    :param log: Logger
-    :type log: logging.Logger
+    :param kwargs: Options of :class:`BatchSetter`, e.g. ``skip_unchanged``,
+                   ``snapshot``, ``target`` or ``log``
+    :rtype: AttributeSetter
     """
-    with AttributeSetter(nodes, 'disable', False, log=log):
-        yield
+    return AttributeSetter(nodes, 'disable', False, **kwargs)
 
 
-@contextmanager
-def disabled(nodes, log=logger):
+def disabled(nodes, **kwargs):
     """
     Given a list of nodes (:class:`~nuke.Node`), disable on entry and restore
     to original value on exit.
 
     :param nodes: Nodes
     :type nodes: list
-    :param log: Logger
-    :type log: logging.Logger
+    :param kwargs: Options of :class:`BatchSetter`, e.g. ``skip_unchanged``,
+                   ``snapshot``, ``target`` or ``log``
+    :rtype: AttributeSetter
     """
-    with AttributeSetter(nodes, 'disable', True, log=log):
-        yield
+    return AttributeSetter(nodes, 'disable', True, **kwargs)
 
 
-@contextmanager
-def set_attr(nodes, attr, value, log=logger):
+def set_attr(nodes, attr, value, **kwargs):
     """
     Given a list of nodes (:class:`~nuke.Node`), set a given ``attr`` to
     ``value`` on entry and restore to original value on exit.
@@ -113,60 +484,494 @@ def set_attr(nodes, attr, value, log=logger):
     :type attr: str
     :param value: Value
     :type value: str, int, float, bool
-    :param log: Logger
-    :type log: logging.Logger
+    :param kwargs: Options of :class:`BatchSetter`, e.g. ``skip_unchanged``,
+                   ``snapshot``, ``target`` or ``log``
+    :rtype: AttributeSetter
     """
-    with AttributeSetter(nodes, attr, value, log=log):
-        yield
+    return AttributeSetter(nodes, attr, value, **kwargs)
+
+
+def set_attrs(assignments, **kwargs):
+    """
+    Given a mapping of nodes (:class:`~nuke.Node`) to ``{attr: value}``
+    dictionaries, set all attributes on entry and restore to original values
+    on exit. See :class:`BatchSetter`.
+
+    :param assignments: Node to ``{attr: value}`` mapping or
+                        ``(nodes, {attr: value})`` tuple
+    :type assignments: dict, list or tuple
+    :param kwargs: Options of :class:`BatchSetter`, e.g. ``skip_unchanged``,
+                   ``snapshot``, ``target`` or ``log``
+    :rtype: BatchSetter
+    """
+    return BatchSetter(assignments, **kwargs)
+
 
+#: Registries in ``nuke.callbacks`` detached by :class:`CallbackSuppressor`
+SUPPRESSED_CALLBACKS = ('knobChangeds', 'updateUIs', 'autolabels')
 
-class AttributeSetter(object):
-    def __init__(self, nodes, attr, value, log=logger):
+
+class CallbackSuppressor(object):
+    def __init__(self, registries=SUPPRESSED_CALLBACKS, undo=True):
         """
-        Given a list of nodes (:class:`~nuke.Node`), set a given ``attr`` to
-        ``value`` on entry and restore to original value on exit.
+        Detach the Python callbacks registered in ``nuke.callbacks`` and
+        disable undo recording while the context is entered, so that setting
+        many knobs doesn't run every ``knobChanged`` callback and record an
+        undo step per knob.
+
+        Callbacks registered while the context is entered are kept; on exit
+        the detached callbacks are put back in front of them.
+
+        :param registries: Names of the ``nuke.callbacks`` registries to
+                           detach (default: :data:`SUPPRESSED_CALLBACKS`)
+        :type registries: tuple
+        :param undo: Disable undo recording (default: True)
+        :type undo: bool
+        """
+        self.registries = registries
+        self.undo = undo
 
-        :param nodes: Nodes
-        :type nodes: list
-        :param attr: Attribute
-        :type attr: str
-        :param value: Value
-        :type value: str, int, float, bool
+    def __enter__(self):
+        self.detached = {}
+        for name in self.registries:
+            registry = getattr(nuke.callbacks, name, None)
+            if registry:
+                self.detached[name] = dict(registry)
+                registry.clear()
+        self.undo_disabled = self.undo and not nuke.Undo.disabled()
+        if self.undo_disabled:
+            nuke.Undo.disable()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.undo_disabled:
+            nuke.Undo.enable()
+        for name, detached in self.detached.items():
+            registry = getattr(nuke.callbacks, name)
+            for cls, callbacks in detached.items():
+                registry.setdefault(cls, [])[:0] = callbacks
+        self.detached = {}
+
+
+class BatchSetter(object):
+    def __init__(self, assignments, skip_unchanged=False, snapshot=False,
+                 target=None, suppress_callbacks=False, notify=None,
+                 main_thread=False, log=logger):
+        """
+        Given a mapping of nodes (:class:`~nuke.Node`) to ``{attr: value}``
+        dictionaries, set every ``attr`` to its ``value`` on entry and restore
+        all original values on exit.
+
+        To apply the same ``{attr: value}`` dictionary to many nodes, pass a
+        ``(nodes, {attr: value})`` tuple instead of a mapping.
+
+        Every node, knob and value type is validated and every knob looked up
+        once, when the context is created, before anything is written. If a
+        knob still fails to be set on entry, all values already written are
+        rolled back before :class:`NukeContextError` is raised. The context
+        can then be entered and exited any number of times; all values are
+        applied in a single pass and restored in a single reverse pass on
+        exit. Entering it again before it is exited raises
+        :class:`NukeContextError`.
+
+        Original values are recorded by node full name in the
+        :class:`~nukecontexts.journal.Journal` shared by all contexts entered
+        in the same thread. The context only keeps the knob of every entry of
+        its journal segment in :attr:`handles`, in the same order, and writes
+        the original values back through them.
+
+        With ``skip_unchanged``, knobs that already hold their target value
+        are neither written on entry nor restored on exit. The number of
+        skipped writes is available as :attr:`skipped`.
+
+        With ``snapshot``, the full state of every changed node is captured
+        in a :class:`~nukecontexts.snapshot.Snapshot` on entry and restored
+        from it on exit, which keeps animation curves and expressions.
+
+        With a ``target``, only nodes upstream of it are changed; changes to
+        all other nodes can't affect its render and are skipped. The number
+        of pruned assignments is available as :attr:`pruned`.
+
+        With ``suppress_callbacks``, ``knobChanged`` callbacks are detached
+        and undo is disabled while values are set and restored, see
+        :class:`CallbackSuppressor`. ``notify`` is then called once after
+        entry and once after exit with the list of changed nodes, in place of
+        the per-knob callbacks.
+
+        Errors while looking up knobs, entering or exiting are reported
+        without blocking, see :mod:`nukecontexts.reporting`.
+
+        With ``main_thread``, the knob lookup, the whole entry and the whole
+        exit each run in Nuke's main thread in a single
+        :func:`nuke.executeInMainThreadWithResult` call, so the context can be
+        used from a worker thread without a round trip per knob, see
+        :func:`run_in_main_thread`.
+
+        :param assignments: Node to ``{attr: value}`` mapping or
+                            ``(nodes, {attr: value})`` tuple
+        :type assignments: dict, list or tuple
+        :param skip_unchanged: Only write values that differ (default: False)
+        :type skip_unchanged: bool
+        :param snapshot: Restore from a node snapshot (default: False)
+        :type snapshot: bool
+        :param target: Only change nodes upstream of this node
+                       (default: None)
+        :type target: :class:`~nuke.Node`
+        :param suppress_callbacks: Detach callbacks and disable undo while
+                                   setting values (default: False)
+        :type suppress_callbacks: bool
+        :param notify: Callable receiving the changed nodes after entry and
+                       exit when callbacks are suppressed (default: None)
+        :type notify: callable
+        :param main_thread: Run lookup, entry and exit in the main thread
+                            (default: False)
+        :type main_thread: bool
         :param log: Logger
         :type log: logging.Logger
         """
-        if not isinstance(nodes, list):
-            nodes = [nodes]
-        self.nodes = nodes
-        self.attr = attr
-        self.value = value
+        if isinstance(assignments, tuple):
+            nodes, values = assignments
+            nodes = as_list(nodes)
+            items = sorted(values.items())
+            self.attrs = [attr for _ in nodes for attr, _ in items]
+            self.values = [value for _ in nodes for _, value in items]
+            if len(items) != 1:
+                nodes = [node for node in nodes for _ in items]
+            self.nodes = nodes
+        else:
+            if isinstance(assignments, dict):
+                assignments = list(assignments.items())
+            self.nodes, self.attrs, self.values = [], [], []
+            for node, values in assignments:
+                for attr, value in sorted(values.items()):
+                    self.nodes.append(node)
+                    self.attrs.append(attr)
+                    self.values.append(value)
+        self.skip_unchanged = skip_unchanged
+        self.snapshot = snapshot
+        self.target = target
+        self.suppress_callbacks = suppress_callbacks
+        self.notify = notify
+        self.main_thread = main_thread
+        self.skipped = 0
+        self.pruned = 0
         self.log = log
+        self.saved = Journal()
+        self.handles = []
+        try:
+            if main_thread:
+                self.knobs = run_in_main_thread(self.lookup)
+            else:
+                self.knobs = self.lookup()
+        except Exception:
+            self._report('lookup')
+            raise
+
+    @property
+    def assignments(self):
+        """
+        :return: ``(node, attr, value)`` tuples
+        :rtype: list
+        """
+        return list(zip(self.nodes, self.attrs, self.values))
 
-    def __enter__(self):
-        self.enter_values = {}
-        for node in self.nodes:
+    def lookup(self):
+        """
+        Validate every node and value and look up the knob of every
+        assignment.
+
+        :return: Knobs, in the order of :attr:`assignments`
+        :rtype: list
+        """
+        knobs = []
+        for node, attr, value in zip(self.nodes, self.attrs, self.values):
             try:
                 assert node
             except AssertionError:
                 raise NukeContextError('Invalid node')
             try:
-                self.enter_values[node] = node[self.attr].value()
+                knob = node[attr]
             except NameError as err:
                 raise NukeContextError('Node \'{0}\': {1}'.format(
                     node.name(), err.args[0]))
-            logger.info('Entering context: ({0}|{1}|{2})'.format(
-                node.name(), self.attr, self.value))
-            try:
-                node[self.attr].setValue(self.value)
-            except TypeError as err:
-                raise NukeContextError('Attribute \'{0}\': {1}'.format(
-                    self.attr, err.args[0]))
+            validate_value(knob, attr, value)
+            knobs.append(knob)
+        return knobs
+
+    def _by_name(self):
+        return dict((node.fullName(), node) for node in set(self.nodes))
+
+    def _positions(self):
+        self.pruned = 0
+        if self.target is None:
+            return range(len(self.nodes))
+        upstream = dag.upstream(self.target)
+        nodes = self.nodes
+        positions = [position for position in range(len(nodes))
+                     if nodes[position] in upstream]
+        self.pruned = len(nodes) - len(positions)
+        return positions
+
+    def resolve(self):
+        """
+        :return: ``(node, attr, knob, value)`` tuples of all knobs to set,
+                 without those not upstream of :attr:`target`
+        :rtype: list
+        """
+        return [(self.nodes[position], self.attrs[position],
+                 self.knobs[position], self.values[position])
+                for position in self._positions()]
+
+    @property
+    def enter_values(self):
+        """
+        :return: Original values keyed by ``(node, attr)``
+        :rtype: dict
+        """
+        nodes = self._by_name()
+        return dict(((nodes[name], attr), value)
+                    for name, attr, value in self.saved)
+
+    def metric_labels(self):
+        """
+        :return: Labels recorded with this context's timings, see
+                 :mod:`nukecontexts.metrics`
+        :rtype: dict
+        """
+        return {'context': self.__class__.__name__,
+                'nodes': len(set(self.nodes)),
+                'knobs': len(self.nodes)}
+
+    def __enter__(self):
+        try:
+            self._run('context_enter', self._enter)
+        except Exception:
+            self._report('enter')
+            raise
 
     def __exit__(self, exc_type, exc_value, traceback):
-        for node, enter_value in self.enter_values.iteritems():
-            logger.info('Restoring context: ({0}|{1}|{2})'.format(
-                node.name(), self.attr, enter_value))
-            node[self.attr].setValue(enter_value)
+        try:
+            self._run('context_exit', self._exit)
+        except Exception:
+            self._report('exit')
+            raise
+
+    def _report(self, phase):
+        reporting.report(context=self.__class__.__name__, phase=phase,
+                         knobs=len(self.nodes))
+
+    def _run(self, metric, function):
+        if self.main_thread:
+            return run_in_main_thread(self._run_local, metric, function)
+        return self._run_local(metric, function)
+
+    def _run_local(self, metric, function):
+        if not self.suppress_callbacks:
+            return self._timed(metric, function)
+        with CallbackSuppressor():
+            self._timed(metric, function)
+        if self.notify is not None:
+            by_name = self._by_name()
+            nodes = []
+            seen = set()
+            for name, _, _ in self.saved:
+                if name not in seen:
+                    seen.add(name)
+                    nodes.append(by_name[name])
+            self.notify(nodes)
+
+    def _timed(self, metric, function):
+        if not metrics.enabled():
+            return function(False)
+        with metrics.timer(metric, **self.metric_labels()):
+            return function(True)
+
+    def _enter(self, timed):
+        if isinstance(self.saved, Segment):
+            raise NukeContextError('{0} is already entered'.format(
+                self.__class__.__name__))
+        start = time.time()
+        debug = self.log.isEnabledFor(logging.DEBUG)
+        self.skipped = 0
+        nodes, attrs, knobs, values = (self.nodes, self.attrs, self.knobs,
+                                       self.values)
+        pending = []
+        enter_values = []
+        for position in self._positions():
+            enter_value = knobs[position].value()
+            if self.skip_unchanged and enter_value == values[position]:
+                self.skipped += 1
+                continue
+            pending.append(position)
+            enter_values.append(enter_value)
+        self.state = None
+        if self.snapshot:
+            self.state = Snapshot.capture(
+                list(set(nodes[position] for position in pending)))
+        self.saved = get_journal().begin()
+        self.handles = []
+        journal = self.saved.journal
+        save_name, save_attr, save_value, save_knob = (
+            journal.names.append, journal.attrs.append, journal.values.append,
+            self.handles.append)
+        for position, enter_value in zip(pending, enter_values):
+            name = nodes[position].fullName()
+            attr, knob, value = (attrs[position], knobs[position],
+                                 values[position])
+            if debug:
+                self.log.debug('Entering context: (%s|%s|%s)', name, attr,
+                               value)
+            try:
+                _set_value(knob, attr, value, timed)
+            except Exception as err:
+                self.rollback()
+                if isinstance(err, (TypeError, ValueError)):
+                    raise NukeContextError('Attribute \'{0}\': {1}'.format(
+                        attr, err.args[0]))
+                raise
+            save_name(name)
+            save_attr(attr)
+            save_value(enter_value)
+            save_knob(knob)
+        self.saved.close()
+        if len(self.handles) == len(knobs):
+            # Every knob was written, in order: share the looked up knobs
+            self.handles = knobs
+        self._log_summary('Entered', start)
+
+    def _log_summary(self, action, start):
+        """
+        Log one INFO record for an entry or exit. The counts are also
+        attached to the record as a ``nukecontexts`` dictionary, for
+        structured log handlers.
+        """
+        if not self.log.isEnabledFor(logging.INFO):
+            return
+        summary = {'context': self.__class__.__name__,
+                   'action': action.lower(),
+                   'nodes': len(set(name for name, _, _ in self.saved)),
+                   'knobs': sorted(set(attr for _, attr, _ in self.saved)),
+                   'values': len(self.saved),
+                   'skipped': self.skipped,
+                   'pruned': self.pruned,
+                   'snapshot': self.state is not None,
+                   'seconds': time.time() - start}
+        self.log.info('%s %s: %d value(s) of %s on %d node(s), %d skipped, '
+                      '%d pruned in %.6fs', action, summary['context'],
+                      summary['values'], ', '.join(summary['knobs']) or '-',
+                      summary['nodes'], summary['skipped'],
+                      summary['pruned'], summary['seconds'],
+                      extra={'nukecontexts': summary})
+
+    def rollback(self):
+        """
+        Restore every value written so far on entry, in reverse order.
+        """
+        if self.state is not None:
+            self.state.restore()
+        else:
+            for knob, (name, attr, enter_value) in zip(
+                    reversed(self.handles), reversed(self.saved)):
+                try:
+                    knob.setValue(enter_value)
+                except Exception as err:
+                    self.log.error('Rollback failed: (%s|%s|%s): %s',
+                                   name, attr, enter_value, err)
+        self.log.warning('Rolled back %d value(s)', len(self.saved))
+        if isinstance(self.saved, Segment):
+            self.saved.detach()
+        self.saved = Journal()
+        self.handles = []
+
+    def _exit(self, timed):
+        start = time.time()
+        if self.state is not None:
+            self.state.restore()
+        else:
+            debug = self.log.isEnabledFor(logging.DEBUG)
+            for knob, (name, attr, enter_value) in zip(
+                    reversed(self.handles), reversed(self.saved)):
+                if debug:
+                    self.log.debug('Restoring context: (%s|%s|%s)',
+                                   name, attr, enter_value)
+                _set_value(knob, attr, enter_value, timed)
+        if isinstance(self.saved, Segment):
+            self.saved = self.saved.detach()
+        self.handles = []
+        self._log_summary('Restored', start)
+
+
+def _set_value(knob, attr, value, timed):
+    if not timed:
+        knob.setValue(value)
+        return
+    start = time.time()
+    knob.setValue(value)
+    metrics.record('set_value', time.time() - start, knob=attr)
+
+
+class AttributeSetter(BatchSetter):
+    def __init__(self, nodes, attr, value, **kwargs):
+        """
+        Given a list of nodes (:class:`~nuke.Node`), set a given ``attr`` to
+        ``value`` on entry and restore to original value on exit.
+
+        :param nodes: Nodes
+        :type nodes: list
+        :param attr: Attribute
+        :type attr: str
+        :param value: Value
+        :type value: str, int, float, bool
+        :param kwargs: Options of :class:`BatchSetter`, e.g.
+                       ``skip_unchanged``, ``snapshot``, ``target`` or ``log``
+        """
+        nodes = as_list(nodes)
+        self.nodes = nodes
+        self.attr = attr
+        self.value = value
+        super(AttributeSetter, self).__init__((nodes, {attr: value}),
+                                              **kwargs)
+
+    @property
+    def enter_values(self):
+        """
+        :return: Original values keyed by node
+        :rtype: dict
+        """
+        nodes = self._by_name()
+        return dict((nodes[name], value) for name, _, value in self.saved)
+
+
+class Plan(BatchSetter):
+    def __init__(self, contexts, **kwargs):
+        """
+        Given a list of attribute contexts (:class:`AttributeSetter`,
+        :class:`BatchSetter` or :class:`Plan`), compile them into a single
+        flat context. Where several contexts set the same knob, the last one
+        wins, so every knob is written at most once on entry and only its
+        original value is restored on exit.
+
+        A plan can be entered any number of times, e.g. once per render.
+
+        :param contexts: Attribute contexts
+        :type contexts: list
+        :param kwargs: Options of :class:`BatchSetter`, e.g.
+                       ``skip_unchanged``, ``snapshot``, ``target`` or ``log``
+        """
+        self.contexts = list(contexts)
+        values = {}
+        order = []
+        for context in self.contexts:
+            try:
+                assignments = context.assignments
+            except AttributeError:
+                raise NukeContextError('Context {0!r} cannot be compiled into '
+                                       'a plan'.format(context))
+            for node, attr, value in assignments:
+                if (node, attr) not in values:
+                    order.append((node, attr))
+                values[(node, attr)] = value
+        super(Plan, self).__init__([(node, {attr: values[(node, attr)]})
+                                    for node, attr in order], **kwargs)
 
 
 @contextmanager
@@ -184,8 +989,9 @@ def multiple_contexts(contexts):
            'Use contextlib.nested(*contexts)')
     nuke.warning(msg)
 
-    for ctx in contexts:
-        ctx.__enter__()
+    with metrics.timer('multiple_contexts_enter', contexts=len(contexts)):
+        for ctx in contexts:
+            ctx.__enter__()
 
     err = None
     exc_info = (None, None, None)
@@ -196,9 +1002,10 @@ def multiple_contexts(contexts):
 
     # exc_info gets passed to each subsequent ctx.__exit__
     # unless one of them suppresses the exception by returning True
-    for ctx in reversed(contexts):
-        if ctx.__exit__(*exc_info):
-            err = False
-            exc_info = (None, None, None)
+    with metrics.timer('multiple_contexts_exit', contexts=len(contexts)):
+        for ctx in reversed(contexts):
+            if ctx.__exit__(*exc_info):
+                err = False
+                exc_info = (None, None, None)
     if err:
         raise err
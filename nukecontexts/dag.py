@@ -0,0 +1,132 @@
+"""
+Cached upstream dependencies, used to prune context changes that can't affect
+a given render.
+
+Usage:
+
+>>> with ctx.set_attr(grade_nodes, 'white', 2.0, target=write):
+>>>     nuke.execute(write.name(), 1, 1, 1)
+"""
+from nukecontexts import import_nuke
+
+nuke = import_nuke()
+
+_index = None
+
+
+class DagIndex(object):
+    """
+    Cache of the nodes (:class:`~nuke.Node`) upstream of render targets,
+    computed with :func:`nuke.dependencies`. The nodes inside upstream groups
+    and gizmos are included, since :func:`nuke.dependencies` of a group only
+    returns its inputs.
+
+    The cache is dropped whenever a node is created or deleted. Nuke only
+    runs ``knobChanged`` callbacks for nodes with an open control panel and
+    never without a GUI, so rewiring isn't tracked with callbacks. Instead,
+    the dependencies of every cached node and the nodes of every cached group
+    are stored with each set and compared on every lookup, and the set is
+    computed again when they differ.
+    """
+    def __init__(self):
+        self.upstream_nodes = {}
+        self.registered = False
+
+    def register(self):
+        """
+        Register the callbacks invalidating the cache.
+        """
+        if self.registered:
+            return
+        nuke.addOnCreate(self.invalidate)
+        nuke.addOnDestroy(self.invalidate)
+        self.registered = True
+
+    def close(self):
+        """
+        Unregister the callbacks and drop the cache.
+        """
+        if self.registered:
+            nuke.removeOnCreate(self.invalidate)
+            nuke.removeOnDestroy(self.invalidate)
+            self.registered = False
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Drop all cached upstream node sets.
+        """
+        self.upstream_nodes = {}
+
+    def upstream(self, target):
+        """
+        :param target: Render target, e.g. a Write node
+        :type target: :class:`~nuke.Node`
+        :return: ``target``, every node it depends on through inputs, hidden
+                 inputs or expressions and the nodes inside any of them that
+                 are groups
+        :rtype: set
+        """
+        self.register()
+        try:
+            upstream, nodes, signature = self.upstream_nodes[target]
+        except KeyError:
+            pass
+        else:
+            if _signature(nodes) == signature:
+                return upstream
+        what = nuke.INPUTS | nuke.HIDDEN_INPUTS | nuke.EXPRESSIONS
+        upstream = set()
+        frontier = [target]
+        while frontier:
+            added = []
+            for node in frontier:
+                if node not in upstream:
+                    upstream.add(node)
+                    added.append(node)
+            if not added:
+                break
+            frontier = nuke.dependencies(added, what)
+            for node in added:
+                if isinstance(node, nuke.Group):
+                    frontier.extend(node.nodes())
+        nodes = list(upstream)
+        self.upstream_nodes[target] = (upstream, nodes, _signature(nodes))
+        return upstream
+
+
+def _signature(nodes):
+    """
+    :return: Dependencies of every node and the nodes of every group, in the
+             order of ``nodes``
+    :rtype: list
+    """
+    what = nuke.INPUTS | nuke.HIDDEN_INPUTS | nuke.EXPRESSIONS
+    signature = []
+    for node in nodes:
+        dependencies = node.dependencies(what)
+        if isinstance(node, nuke.Group):
+            dependencies.extend(node.nodes())
+        signature.append(dependencies)
+    return signature
+
+
+def get_index():
+    """
+    :return: Shared DAG index, created on first use
+    :rtype: DagIndex
+    """
+    global _index
+    if _index is None:
+        _index = DagIndex()
+    return _index
+
+
+def upstream(target):
+    """
+    :param target: Render target, e.g. a Write node
+    :type target: :class:`~nuke.Node`
+    :return: ``target`` and every node upstream of it
+    :rtype: set
+    """
+    return get_index().upstream(target)
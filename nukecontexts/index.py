@@ -0,0 +1,233 @@
+"""
+Node lookup by name, glob, class and knob value without walking the whole
+script on every call.
+
+Usage:
+
+>>> from nukecontexts.index import select
+>>> with ctx.disabled(select(cls='Grade', name='*_fix')):
+>>>     nuke.execute(write.name(), 1, 1, 1)
+"""
+import fnmatch
+
+from nukecontexts import import_nuke
+
+nuke = import_nuke()
+
+GLOB_CHARACTERS = '*?['
+
+_index = None
+
+
+class NodeIndex(object):
+    """
+    Index of all nodes (:class:`~nuke.Node`) by full name and class, built
+    with a single :func:`nuke.allNodes` call on first use and kept current
+    through ``onCreate`` and ``onDestroy`` callbacks.
+
+    Nuke doesn't run ``knobChanged`` callbacks for renames made by scripts or
+    without a GUI, so entries are confirmed against the current full name of
+    their node on every lookup. Renamed nodes are indexed again under their
+    new name and deleted nodes are dropped.
+    """
+    def __init__(self):
+        self.by_name = None
+        self.by_class = None
+        self.keys = None
+
+    def build(self):
+        """
+        Build the index and register its callbacks.
+        """
+        self.by_name = {}
+        self.by_class = {}
+        self.keys = {}
+        for node in nuke.allNodes(recurseGroups=True):
+            self._add(node)
+        nuke.addOnCreate(self._created)
+        nuke.addOnDestroy(self._destroyed)
+
+    def close(self):
+        """
+        Unregister the callbacks and drop the index.
+        """
+        if self.by_name is None:
+            return
+        nuke.removeOnCreate(self._created)
+        nuke.removeOnDestroy(self._destroyed)
+        self.by_name = None
+        self.by_class = None
+        self.keys = None
+
+    def _add(self, node, name=None):
+        self._remove(node)
+        name = name or node.fullName()
+        cls = node.Class()
+        self.by_name[name] = node
+        self.by_class.setdefault(cls, {})[name] = node
+        self.keys[node] = (name, cls)
+
+    def _remove(self, node):
+        # Nuke returns a new object for the same node from every call, so
+        # entries are compared with ==. A deleted node can't be asked for its
+        # name, so it is found through its key.
+        try:
+            name, cls = self.keys.pop(node)
+        except KeyError:
+            return
+        if self.by_name.get(name) == node:
+            del self.by_name[name]
+        if self.by_class[cls].get(name) == node:
+            del self.by_class[cls][name]
+
+    def _created(self):
+        self._add(nuke.thisNode())
+
+    def _destroyed(self):
+        self._remove(nuke.thisNode())
+
+    def _confirm(self, candidates):
+        """
+        :param candidates: Index entries
+        :type candidates: dict
+        :return: ``candidates`` under the current full names of their nodes,
+                 without deleted nodes
+        :rtype: dict
+        """
+        confirmed = {}
+        for name, node in list(candidates.items()):
+            try:
+                full_name = node.fullName()
+            except ValueError:
+                self._remove(node)
+                continue
+            if full_name != name:
+                self._add(node, full_name)
+            confirmed[full_name] = node
+        return confirmed
+
+    def _ensure(self):
+        if self.by_name is None:
+            self.build()
+
+    def get(self, name):
+        """
+        :param name: Full node name
+        :type name: str
+        :return: Node or ``None``
+        :rtype: :class:`~nuke.Node`
+        """
+        self._ensure()
+        node = self.by_name.get(name)
+        if node is not None and self._confirm({name: node}).get(name) == node:
+            return node
+        node = nuke.toNode(name)
+        if node is not None:
+            self._add(node, name)
+        return node
+
+    def query(self, name=None, cls=None, knobs=None, predicate=None):
+        """
+        :param name: Full node name or glob pattern (default: any)
+        :type name: str
+        :param cls: Node class (default: any)
+        :type cls: str
+        :param knobs: Required ``{knob: value}`` (default: None)
+        :type knobs: dict
+        :param predicate: Callable taking a node and returning whether it
+                          matches (default: None)
+        :type predicate: callable
+        :return: Matching nodes, sorted by full name
+        :rtype: list
+        """
+        self._ensure()
+        if name and not any(char in name for char in GLOB_CHARACTERS):
+            node = self.get(name)
+            candidates = {name: node} if node is not None else {}
+        elif cls is not None:
+            candidates = self._confirm(self.by_class.get(cls, {}))
+        else:
+            candidates = self._confirm(self.by_name)
+        if name:
+            candidates = dict((full_name, node)
+                              for full_name, node in candidates.items()
+                              if fnmatch.fnmatchcase(full_name, name))
+        nodes = []
+        for full_name, node in sorted(candidates.items()):
+            if cls is not None and node.Class() != cls:
+                continue
+            if knobs and not _knobs_match(node, knobs):
+                continue
+            if predicate is not None and not predicate(node):
+                continue
+            nodes.append(node)
+        return nodes
+
+
+def _knobs_match(node, knobs):
+    for knob, value in knobs.items():
+        try:
+            if node[knob].value() != value:
+                return False
+        except NameError:
+            return False
+    return True
+
+
+def get_index():
+    """
+    :return: Shared node index, created on first use
+    :rtype: NodeIndex
+    """
+    global _index
+    if _index is None:
+        _index = NodeIndex()
+    return _index
+
+
+class Selection(object):
+    """
+    Node query accepted by contexts in place of a list of nodes. It is
+    resolved against the node index when the context is created.
+    """
+    def __init__(self, name=None, cls=None, knobs=None, predicate=None,
+                 index=None):
+        self.name = name
+        self.cls = cls
+        self.knobs = knobs
+        self.predicate = predicate
+        self.index = index
+
+    def nodes(self):
+        """
+        :return: Matching nodes
+        :rtype: list
+        """
+        index = self.index or get_index()
+        return index.query(name=self.name, cls=self.cls, knobs=self.knobs,
+                           predicate=self.predicate)
+
+    def __iter__(self):
+        return iter(self.nodes())
+
+
+def select(name=None, cls=None, knobs=None, predicate=None, index=None):
+    """
+    Select nodes by name or glob pattern, class, knob values and an arbitrary
+    predicate. All given criteria must match.
+
+    :param name: Full node name or glob pattern (default: any)
+    :type name: str
+    :param cls: Node class (default: any)
+    :type cls: str
+    :param knobs: Required ``{knob: value}`` (default: None)
+    :type knobs: dict
+    :param predicate: Callable taking a node and returning whether it matches
+                      (default: None)
+    :type predicate: callable
+    :param index: Node index (default: :func:`get_index`)
+    :type index: NodeIndex
+    :rtype: Selection
+    """
+    return Selection(name=name, cls=cls, knobs=knobs, predicate=predicate,
+                     index=index)
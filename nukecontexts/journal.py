@@ -0,0 +1,133 @@
+"""
+Compact undo journal of the original knob values saved by attribute
+contexts.
+
+Instead of one dictionary or list of tuples per context, every thread keeps a
+single :class:`Journal` of parallel lists, shared by all contexts entered in
+it. Each entered context owns a :class:`Segment` of the journal, which is
+detached into a journal of its own when the context is exited. Nodes are
+recorded by full name, so the journal holds no references to Nuke objects.
+"""
+import threading
+
+_local = threading.local()
+
+
+class Journal(object):
+    """
+    Node full names, attributes and original values, in parallel lists.
+    """
+    __slots__ = ('names', 'attrs', 'values', 'segments')
+
+    def __init__(self, names=None, attrs=None, values=None):
+        self.names = names or []
+        self.attrs = attrs or []
+        self.values = values or []
+        self.segments = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(zip(self.names, self.attrs, self.values))
+
+    def __reversed__(self):
+        return iter(zip(reversed(self.names), reversed(self.attrs),
+                        reversed(self.values)))
+
+    def append(self, name, attr, value):
+        """
+        Record the original ``value`` of ``attr`` on the node named ``name``.
+        """
+        self.names.append(name)
+        self.attrs.append(attr)
+        self.values.append(value)
+
+    def begin(self):
+        """
+        :return: New segment, holding every entry appended until it is
+                 closed
+        :rtype: Segment
+        """
+        segment = Segment(self, len(self.values))
+        self.segments.append(segment)
+        return segment
+
+    def release(self, segment):
+        """
+        Remove the entries of ``segment`` from the journal, in any order
+        relative to other segments.
+
+        :return: The segment's entries
+        :rtype: Journal
+        """
+        start, stop = segment.start, segment.end()
+        detached = Journal(self.names[start:stop], self.attrs[start:stop],
+                           self.values[start:stop])
+        for entries in (self.names, self.attrs, self.values):
+            del entries[start:stop]
+        self.segments.remove(segment)
+        size = stop - start
+        for other in self.segments:
+            if other.start >= stop:
+                other.start -= size
+                if other.stop is not None:
+                    other.stop -= size
+        return detached
+
+
+class Segment(object):
+    """
+    The entries of one entered context in a shared :class:`Journal`.
+    """
+    __slots__ = ('journal', 'start', 'stop')
+
+    def __init__(self, journal, start):
+        self.journal = journal
+        self.start = start
+        self.stop = None
+
+    def end(self):
+        if self.stop is None:
+            return len(self.journal.values)
+        return self.stop
+
+    def close(self):
+        """
+        Stop recording entries into this segment.
+        """
+        self.stop = len(self.journal.values)
+
+    def __len__(self):
+        return self.end() - self.start
+
+    def _lists(self):
+        journal = self.journal
+        start, stop = self.start, self.end()
+        return (journal.names[start:stop], journal.attrs[start:stop],
+                journal.values[start:stop])
+
+    def __iter__(self):
+        return iter(zip(*self._lists()))
+
+    def __reversed__(self):
+        return iter(zip(*[reversed(entries) for entries in self._lists()]))
+
+    def detach(self):
+        """
+        :return: The segment's entries, removed from the shared journal
+        :rtype: Journal
+        """
+        return self.journal.release(self)
+
+
+def get_journal():
+    """
+    :return: Journal shared by all contexts entered in the current thread
+    :rtype: Journal
+    """
+    try:
+        return _local.journal
+    except AttributeError:
+        _local.journal = Journal()
+        return _local.journal
@@ -0,0 +1,208 @@
+from collections import namedtuple
+
+from nukecontexts import dag, logger
+
+MISSING = object()
+
+Variant = namedtuple('Variant', ['index', 'contexts'])
+
+
+def gray_order(sizes):
+    """
+    Given the sizes of a number of axes, return all index combinations in
+    reflected mixed-radix Gray code order, so that exactly one axis changes
+    between consecutive combinations. The last axis changes fastest.
+
+    :param sizes: Axis sizes
+    :type sizes: list
+    :return: Index tuples
+    :rtype: list
+    """
+    order = [()]
+    for size in sizes:
+        extended = []
+        for idx, prefix in enumerate(order):
+            positions = range(size)
+            if idx % 2:
+                positions = reversed(positions)
+            extended.extend(prefix + (position,) for position in positions)
+        order = extended
+    return order
+
+
+def state_distance(state_a, state_b):
+    """
+    Given two ``{(node, attr): value}`` states, return the number of knobs
+    that need to be written to get from one to the other.
+
+    :param state_a: State
+    :type state_a: dict
+    :param state_b: State
+    :type state_b: dict
+    :rtype: int
+    """
+    keys = set(state_a)
+    keys.update(state_b)
+    return sum(1 for key in keys
+               if state_a.get(key, MISSING) != state_b.get(key, MISSING))
+
+
+class Matrix(object):
+    """
+    Render every combination of a number of axes of contexts, changing as
+    few knobs as possible between consecutive variants.
+
+    Each axis is a list of attribute contexts (:class:`~ctx.AttributeSetter`
+    or :class:`~ctx.BatchSetter`). Only the difference between one variant
+    and the next is applied; the original state is restored once on exit.
+    With a ``target``, knobs on nodes that aren't upstream of it are never
+    touched.
+
+    Usage:
+
+    >>> file_types = [ctx.AttributeSetter(write, 'file_type', 'jpeg'),
+    >>>               ctx.AttributeSetter(write, 'file_type', 'png')]
+    >>> positions = [ctx.AttributeSetter(switch, 'which', 0),
+    >>>              ctx.AttributeSetter(switch, 'which', 1)]
+    >>> with Matrix([file_types, positions]) as variants:
+    >>>     for variant in variants:
+    >>>         nuke.execute(write.name(), 1, 1, 1)
+    """
+    def __init__(self, axes, order='gray', target=None, log=logger):
+        """
+        :param axes: Lists of attribute contexts
+        :type axes: list
+        :param order: Execution order, ``'gray'`` or ``'nearest'``
+                      (default: 'gray')
+        :type order: str
+        :param target: Only change nodes upstream of this node
+                       (default: None)
+        :type target: :class:`~nuke.Node`
+        :param log: Logger
+        :type log: logging.Logger
+        """
+        if order not in ('gray', 'nearest'):
+            raise ValueError('Unknown order \'{0}\''.format(order))
+        self.axes = [list(axis) for axis in axes]
+        self.order = order
+        self.target = target
+        self.log = log
+        self.writes = 0
+
+    def contexts(self, index):
+        """
+        :param index: Position on every axis
+        :type index: tuple
+        :return: Contexts making up the variant at ``index``
+        :rtype: tuple
+        """
+        return tuple(axis[position]
+                     for axis, position in zip(self.axes, index))
+
+    def state(self, index):
+        """
+        :param index: Position on every axis
+        :type index: tuple
+        :return: Target values of the variant at ``index``, later axes
+                 win for knobs set by several contexts
+        :rtype: dict
+        """
+        state = {}
+        for context in self.contexts(index):
+            for node, attr, value in context.assignments:
+                state[(node, attr)] = value
+        return state
+
+    def variants(self):
+        """
+        :return: Index tuples of all variants in execution order
+        :rtype: list
+        """
+        if self.order == 'nearest':
+            return self._nearest_order()
+        return self._gray_order()
+
+    def _gray_order(self):
+        # Vary the axes that touch the most knobs the slowest
+        costs = [max([len(context.assignments) for context in axis] or [0])
+                 for axis in self.axes]
+        axes = sorted(range(len(self.axes)), key=lambda axis: -costs[axis])
+        order = []
+        for permuted in gray_order([len(self.axes[axis]) for axis in axes]):
+            index = [None] * len(axes)
+            for axis, position in zip(axes, permuted):
+                index[axis] = position
+            order.append(tuple(index))
+        return order
+
+    def _nearest_order(self):
+        remaining = gray_order([len(axis) for axis in self.axes])
+        states = dict((index, self.state(index)) for index in remaining)
+        order = [remaining.pop(0)]
+        while remaining:
+            current = states[order[-1]]
+            closest = min(remaining, key=lambda index: state_distance(
+                current, states[index]))
+            remaining.remove(closest)
+            order.append(closest)
+        return order
+
+    def apply(self, index):
+        """
+        Write only the knobs that differ between the current state and the
+        variant at ``index``. Knobs the variant doesn't set are returned to
+        their original values.
+
+        :param index: Position on every axis
+        :type index: tuple
+        """
+        upstream = None
+        if self.target is not None:
+            upstream = dag.upstream(self.target)
+        state = {}
+        for context in self.contexts(index):
+            for node, attr, knob, value in context.resolve():
+                if upstream is None or node in upstream:
+                    state[(node, attr)] = (knob, value)
+        for key, (knob, value) in self.current.items():
+            if key not in state:
+                state[key] = (knob, self.original[key])
+        for key, (knob, value) in state.items():
+            if key not in self.original:
+                self.original[key] = knob.value()
+                self.current[key] = (knob, self.original[key])
+            if self.current[key][1] != value:
+                knob.setValue(value)
+                self.writes += 1
+            self.current[key] = (knob, value)
+        self.log.info('Entering variant: %s', index)
+
+    def restore(self):
+        """
+        Restore every knob touched by any variant to its original value.
+        """
+        for key, (knob, value) in self.current.items():
+            if value != self.original[key]:
+                knob.setValue(self.original[key])
+                self.writes += 1
+        self.log.info('Restored %d knob(s)', len(self.current))
+        self.original = {}
+        self.current = {}
+
+    def _iterate(self):
+        for index in self.variants():
+            self.apply(index)
+            yield Variant(index, self.contexts(index))
+
+    def __enter__(self):
+        """
+        :return: Variants in execution order, applied as they are iterated
+        :rtype: generator
+        """
+        self.original = {}
+        self.current = {}
+        self.writes = 0
+        return self._iterate()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.restore()
@@ -0,0 +1,266 @@
+"""
+Timing instrumentation for contexts.
+
+Timings are only taken while at least one sink is registered, so the cost
+without sinks is a single check per context.
+
+Usage:
+
+>>> from nukecontexts import metrics
+>>> sink = metrics.MemorySink()
+>>> metrics.add_sink(sink)
+>>> with ctx.set_attr(node, 'disable', True):
+>>>     nuke.execute(node.name(), 1, 1, 1)
+>>> sink.summary()
+"""
+import json
+import time
+import bisect
+import threading
+
+from nukecontexts import atomic_write
+
+#: Default histogram bucket upper bounds in seconds
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0,
+           10.0, 60.0)
+
+_sinks = []
+
+
+def add_sink(sink):
+    """
+    Register a sink. Any object with a ``record(name, seconds, labels)``
+    method can be used as a sink, as can a plain callable with the same
+    signature (a hook).
+
+    :param sink: Sink or hook
+    :type sink: object or callable
+    """
+    if not hasattr(sink, 'record'):
+        sink = HookSink(sink)
+    _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    """
+    :param sink: Sink or hook previously passed to :func:`add_sink`
+    :type sink: object or callable
+    """
+    for registered in list(_sinks):
+        if registered is sink or getattr(registered, 'hook', None) is sink:
+            _sinks.remove(registered)
+
+
+def enabled():
+    """
+    :return: Whether any sink is registered
+    :rtype: bool
+    """
+    return bool(_sinks)
+
+
+def record(name, seconds, **labels):
+    """
+    Pass a timing to every registered sink.
+
+    :param name: Metric name
+    :type name: str
+    :param seconds: Wall time
+    :type seconds: float
+    """
+    for sink in _sinks:
+        sink.record(name, seconds, labels)
+
+
+class _NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_null_timer = _NullTimer()
+
+
+class _Timer(object):
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record(self.name, time.time() - self.start, **self.labels)
+
+
+def timer(name, **labels):
+    """
+    Time the wrapped block and record it under ``name``. Does nothing if no
+    sink is registered.
+
+    :param name: Metric name
+    :type name: str
+    """
+    if not _sinks:
+        return _null_timer
+    return _Timer(name, labels)
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class HookSink(object):
+    """
+    Call ``hook(name, seconds, labels)`` for every timing.
+    """
+    def __init__(self, hook):
+        self.hook = hook
+
+    def record(self, name, seconds, labels):
+        self.hook(name, seconds, labels)
+
+
+class Histogram(object):
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+
+class MemorySink(object):
+    """
+    Keep a :class:`Histogram` per metric name and label set.
+    """
+    def __init__(self, buckets=BUCKETS):
+        """
+        :param buckets: Histogram bucket upper bounds in seconds
+                        (default: :data:`BUCKETS`)
+        :type buckets: tuple
+        """
+        self.buckets = buckets
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, labels):
+        key = _key(name, labels)
+        with self.lock:
+            try:
+                histogram = self.histograms[key]
+            except KeyError:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.add(seconds)
+
+    def summary(self):
+        """
+        :return: Count, total, minimum and maximum seconds per metric name
+                 and label set
+        :rtype: list
+        """
+        with self.lock:
+            return [{'name': name,
+                     'labels': dict(labels),
+                     'count': histogram.count,
+                     'sum': histogram.sum,
+                     'min': histogram.min,
+                     'max': histogram.max}
+                    for (name, labels), histogram
+                    in sorted(self.histograms.items())]
+
+
+class JsonlSink(object):
+    """
+    Write every timing as one JSON object per line.
+    """
+    def __init__(self, path):
+        """
+        :param path: Output file, appended to
+        :type path: str
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, labels):
+        line = json.dumps({'time': time.time(),
+                           'name': name,
+                           'seconds': seconds,
+                           'labels': labels}, sort_keys=True)
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+
+class PrometheusTextfileSink(MemorySink):
+    """
+    Keep histograms in memory and write them in the Prometheus text format,
+    e.g. for the node exporter's textfile collector, on :meth:`flush`.
+    """
+    def __init__(self, path, prefix='nukecontexts', buckets=BUCKETS):
+        """
+        :param path: Output file, replaced on every flush
+        :type path: str
+        :param prefix: Metric name prefix (default: 'nukecontexts')
+        :type prefix: str
+        :param buckets: Histogram bucket upper bounds in seconds
+                        (default: :data:`BUCKETS`)
+        :type buckets: tuple
+        """
+        super(PrometheusTextfileSink, self).__init__(buckets=buckets)
+        self.path = path
+        self.prefix = prefix
+
+    def render(self):
+        """
+        :return: All histograms in the Prometheus text format
+        :rtype: str
+        """
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        declared = set()
+        for (name, labels), histogram in histograms:
+            metric = '{0}_{1}_seconds'.format(self.prefix, name)
+            if metric not in declared:
+                lines.append('# TYPE {0} histogram'.format(metric))
+                declared.add(metric)
+            cumulative = 0
+            bounds = [repr(bound) for bound in histogram.buckets] + ['+Inf']
+            for bound, count in zip(bounds, histogram.counts):
+                cumulative += count
+                lines.append('{0}_bucket{1} {2}'.format(
+                    metric, _labels(labels + (('le', bound),)), cumulative))
+            lines.append('{0}_sum{1} {2!r}'.format(
+                metric, _labels(labels), histogram.sum))
+            lines.append('{0}_count{1} {2}'.format(
+                metric, _labels(labels), histogram.count))
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """
+        Atomically replace the output file with the current histograms.
+        """
+        atomic_write(self.path, self.render())
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{{{0}}}'.format(','.join(
+        '{0}="{1}"'.format(key, str(value).replace('"', '\\"'))
+        for key, value in labels))
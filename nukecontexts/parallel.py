@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from nukecontexts import dag, import_nuke, logger
+from nukecontexts.ctx import NukeContextError
+
+nuke = import_nuke()
+
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker.py')
+
+RenderResult = namedtuple('RenderResult',
+                          ['job', 'returncode', 'output', 'elapsed'])
+
+
+class RenderError(NukeContextError):
+    def __init__(self, message, results, *args):
+        self.results = results
+        super(RenderError, self).__init__(message, *args)
+
+
+def default_executable():
+    """
+    :return: Command used to start a headless Nuke worker, taken from the
+             ``NUKECONTEXTS_EXECUTABLE`` environment variable or ``nuke -t``
+    :rtype: list
+    """
+    try:
+        return os.environ['NUKECONTEXTS_EXECUTABLE'].split()
+    except KeyError:
+        return ['nuke', '-t']
+
+
+def describe(contexts, write, first, last, script=None, prune=False):
+    """
+    Given a list of attribute contexts (:class:`~ctx.AttributeSetter` or
+    :class:`~ctx.BatchSetter`), a Write node and a frame range, return a
+    plain, picklable description of the render. With ``prune``, knob values
+    on nodes that aren't upstream of the Write node are left out.
+
+    :param contexts: Attribute contexts
+    :type contexts: list
+    :param write: Write node or node name
+    :type write: :class:`~nuke.Node` or str
+    :param first: First frame
+    :type first: int
+    :param last: Last frame
+    :type last: int
+    :param script: Script path (default: the current script)
+    :type script: str
+    :param prune: Leave out nodes not upstream of ``write`` (default: False)
+    :type prune: bool
+    :return: Job description
+    :rtype: dict
+    """
+    if not isinstance(contexts, (list, tuple)):
+        contexts = [contexts]
+    if script is None:
+        script = nuke.root().name()
+    upstream = None
+    if prune:
+        if not hasattr(write, 'fullName'):
+            write = nuke.toNode(write)
+        upstream = dag.upstream(write)
+    if hasattr(write, 'fullName'):
+        write = write.fullName()
+    assignments = []
+    for context in contexts:
+        for node, attr, value in context.assignments:
+            try:
+                assert node
+            except AssertionError:
+                raise NukeContextError('Invalid node')
+            if upstream is not None and node not in upstream:
+                continue
+            assignments.append([node.fullName(), attr, value])
+    return {'script': script,
+            'write': write,
+            'first': first,
+            'last': last,
+            'assignments': assignments}
+
+
+def run_job(job, executable=None, worker=WORKER):
+    """
+    Render a single job description in a separate worker process.
+
+    :param job: Job description, see :func:`describe`
+    :type job: dict
+    :param executable: Worker command (default: :func:`default_executable`)
+    :type executable: list
+    :param worker: Worker script, passed the path to the job file
+                   (default: :mod:`nukecontexts.worker`)
+    :type worker: str
+    :rtype: RenderResult
+    """
+    if executable is None:
+        executable = default_executable()
+    tmp_dir = tempfile.mkdtemp(prefix='nukecontexts_')
+    try:
+        job_file = os.path.join(tmp_dir, 'job.json')
+        with open(job_file, 'w') as f:
+            json.dump(job, f)
+        start = time.time()
+        process = subprocess.Popen(list(executable) + [worker, job_file],
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+        return RenderResult(job, process.returncode,
+                            output.decode('utf-8', 'replace'),
+                            time.time() - start)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def render(jobs, workers=4, executable=None, worker=WORKER,
+           raise_on_error=True, callback=None, log=logger):
+    """
+    Given a list of job descriptions (see :func:`describe`), render them on
+    a pool of headless Nuke worker processes, each opening its own copy of
+    the script.
+
+    Any command taking a worker script and a job file can stand in for Nuke,
+    see ``executable`` and ``worker``.
+
+    :param jobs: Job descriptions
+    :type jobs: list
+    :param workers: Number of worker processes (default: 4)
+    :type workers: int
+    :param executable: Worker command (default: :func:`default_executable`)
+    :type executable: list
+    :param worker: Worker script, passed the path to the job file
+                   (default: :mod:`nukecontexts.worker`)
+    :type worker: str
+    :param raise_on_error: Raise :class:`RenderError` if any job failed
+                           (default: True)
+    :type raise_on_error: bool
+    :param callback: Callable receiving each :class:`RenderResult` as soon as
+                     its job has finished (default: None)
+    :type callback: callable
+    :param log: Logger
+    :type log: logging.Logger
+    :return: Results in the order of ``jobs``
+    :rtype: list
+    """
+    def run(indexed_job):
+        index, job = indexed_job
+        result = run_job(job, executable=executable, worker=worker)
+        log.info('Rendered %s %s-%s in %.2fs (exit code %s)', job['write'],
+                 job['first'], job['last'], result.elapsed, result.returncode)
+        return index, result
+
+    results = [None] * len(jobs)
+    pool = ThreadPool(max(1, min(workers, len(jobs))))
+    try:
+        for index, result in pool.imap_unordered(run, enumerate(jobs)):
+            results[index] = result
+            if callback is not None:
+                callback(result)
+    finally:
+        pool.close()
+        pool.join()
+    failed = [result for result in results if result.returncode]
+    if failed and raise_on_error:
+        raise RenderError('{0} of {1} job(s) failed'.format(
+            len(failed), len(results)), results)
+    return results
@@ -0,0 +1,244 @@
+"""
+Error reporting off the render path. Reports are put on a bounded queue and
+sent by a background thread, so a slow or unreachable error tracker never
+blocks Nuke. When the queue is full, reports are dropped and counted.
+
+Usage:
+
+>>> reporting.install(reporting.Reporter(transport=events.append))
+>>> with ctx.set_attr(write, 'file_type', 'exr'):
+>>>     ...
+>>> reporting.get_reporter().stats
+
+Without a reporter installed, :func:`get_reporter` creates one sending to
+`Sentry <http://sentry.io/>`_ if Raven is installed and ``SENTRY_DSN`` is
+set. The Sentry client is created by the first report, in the background
+thread.
+"""
+import os
+import sys
+import time
+import atexit
+import threading
+import traceback
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    from importlib.util import find_spec
+except ImportError:
+    from pkgutil import find_loader as find_spec
+
+from nukecontexts import get_sentry, logger
+
+_STOP = object()
+_UNSET = object()
+
+_reporter = _UNSET
+
+
+class SentryTransport(object):
+    """
+    Send reports with a Raven client, see :func:`nukecontexts.get_sentry`.
+    """
+    def __init__(self, client=None):
+        """
+        :param client: Sentry client, created by the first report if
+                       ``None`` (default: None)
+        :type client: raven.Client
+        """
+        self.client = client
+
+    def __call__(self, event):
+        if self.client is None:
+            self.client = get_sentry()
+            if self.client is None:
+                raise RuntimeError('Sentry is not available')
+        if event.get('exc_info') is not None:
+            self.client.captureException(exc_info=event['exc_info'],
+                                         tags=event['tags'])
+        else:
+            self.client.captureMessage(event['message'], tags=event['tags'])
+
+
+class Reporter(object):
+    def __init__(self, transport, max_queue=100, exit_timeout=0.5,
+                 log=logger):
+        """
+        Send reports with ``transport`` from a background thread, started
+        with the first report.
+
+        :param transport: Callable receiving each report as a dictionary
+                          with ``message``, ``exception``, ``traceback``,
+                          ``exc_info`` and ``tags``
+        :type transport: callable
+        :param max_queue: Maximum number of pending reports (default: 100)
+        :type max_queue: int
+        :param exit_timeout: Seconds to wait for pending reports when the
+                             interpreter exits (default: 0.5)
+        :type exit_timeout: float
+        :param log: Logger
+        :type log: logging.Logger
+        """
+        self.transport = transport
+        self.queue = queue.Queue(max_queue)
+        self.exit_timeout = exit_timeout
+        self.log = log
+        self.stats = {'queued': 0, 'sent': 0, 'dropped': 0, 'failed': 0}
+        self.thread = None
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def start(self):
+        """
+        Start the background thread, if it isn't running yet.
+        """
+        with self.start_lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run,
+                                           name='nukecontexts-reporter')
+            self.thread.daemon = True
+            self.thread.start()
+            atexit.register(self.flush, self.exit_timeout)
+
+    def report(self, exc_info=None, message=None, **tags):
+        """
+        Queue a report of an exception or a message without blocking.
+
+        :param exc_info: ``sys.exc_info()`` tuple (default: None)
+        :type exc_info: tuple
+        :param message: Message, the exception's by default (default: None)
+        :type message: str
+        :param tags: Tags sent with the report
+        :return: Whether the report was queued
+        :rtype: bool
+        """
+        event = {'exc_info': exc_info,
+                 'exception': None,
+                 'traceback': None,
+                 'message': message,
+                 'tags': tags}
+        if exc_info is not None:
+            event['exception'] = exc_info[0].__name__
+            event['traceback'] = ''.join(traceback.format_exception(
+                *exc_info))
+            if message is None:
+                event['message'] = str(exc_info[1])
+        self.start()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('queued')
+        return True
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            try:
+                if event is _STOP:
+                    return
+                self.transport(event)
+                self._count('sent')
+            except Exception as err:
+                self._count('failed')
+                self.log.warning('Error report failed: %s', err)
+            finally:
+                self.queue.task_done()
+
+    def flush(self, timeout=0.0):
+        """
+        Wait up to ``timeout`` seconds for pending reports to be sent.
+
+        :param timeout: Seconds (default: 0.0)
+        :type timeout: float
+        :return: Whether all reports were sent
+        :rtype: bool
+        """
+        end = time.time() + timeout
+        condition = self.queue.all_tasks_done
+        with condition:
+            while self.queue.unfinished_tasks:
+                remaining = end - time.time()
+                if remaining <= 0:
+                    return False
+                condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """
+        Stop the background thread once pending reports have been sent.
+
+        :param timeout: Seconds to wait, forever if ``None`` (default: None)
+        :type timeout: float
+        """
+        if self.thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+        self.thread = None
+
+
+def install(reporter):
+    """
+    Report errors with ``reporter``, e.g. one with a local stand-in
+    transport in tests. ``None`` disables reporting.
+
+    :param reporter: Reporter
+    :type reporter: Reporter
+    """
+    global _reporter
+    _reporter = reporter
+
+
+def get_reporter():
+    """
+    :return: Installed reporter, a Sentry reporter created on first use or
+             ``None`` if Raven is not installed or ``SENTRY_DSN`` is not set
+    :rtype: Reporter
+    """
+    global _reporter
+    if _reporter is _UNSET:
+        _reporter = None
+        if 'SENTRY_DSN' in os.environ and find_spec('raven') is not None:
+            _reporter = Reporter(SentryTransport())
+    return _reporter
+
+
+def report(exc_info=None, message=None, **tags):
+    """
+    Queue a report with the reporter returned by :func:`get_reporter`, if
+    any. Never blocks and never raises.
+
+    :param exc_info: ``sys.exc_info()`` tuple (default: the exception being
+                     handled)
+    :type exc_info: tuple
+    :param message: Message (default: None)
+    :type message: str
+    :param tags: Tags sent with the report
+    :return: Whether the report was queued
+    :rtype: bool
+    """
+    reporter = get_reporter()
+    if reporter is None:
+        return False
+    if exc_info is None and message is None:
+        exc_info = sys.exc_info()
+        if exc_info[0] is None:
+            return False
+    try:
+        return reporter.report(exc_info, message, **tags)
+    except Exception:
+        return False
@@ -0,0 +1,169 @@
+"""
+Headless runner rendering every variant of a spec (see
+:mod:`nukecontexts.spec`) in a script and writing a JSON timing report.
+
+Usage:
+
+    $ python -m nukecontexts shot010.nk variants.yaml --report report.json
+    $ nuke -t nukecontexts/runner.py shot010.nk variants.yaml \\
+          --report report.json --resume
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+from nukecontexts import __version__, cache, import_nuke, logger, spec
+from nukecontexts.ctx import NukeContextError
+
+nuke = import_nuke()
+
+
+def outputs_exist(write, first, last):
+    """
+    :param write: Write node
+    :type write: :class:`~nuke.Node`
+    :return: Whether every file ``write`` renders from ``first`` to ``last``
+             exists
+    :rtype: bool
+    """
+    files = cache.output_files(write, first, last)
+    return bool(files) and all(os.path.exists(path) for path in files)
+
+
+def run_variant(job, resume=False, claimed=None, log=logger):
+    """
+    Render a single job description in the current script.
+
+    :param job: Job description, see :func:`~nukecontexts.spec.resolve`
+    :type job: dict
+    :param resume: Skip the render if its output files exist
+                   (default: False)
+    :type resume: bool
+    :param claimed: Output files of the variants rendered so far, by path,
+                    updated with this variant's files. The variant fails
+                    without rendering if it would overwrite any of them
+                    (default: None)
+    :type claimed: dict
+    :param log: Logger
+    :type log: logging.Logger
+    :return: Report entry
+    :rtype: dict
+    """
+    entry = {'variant': job.get('variant'),
+             'write': job['write'],
+             'first': job['first'],
+             'last': job['last']}
+    start = time.time()
+    try:
+        with spec.context(job, log=log):
+            write = nuke.toNode(job['write'])
+            entry['files'] = cache.output_files(write, job['first'],
+                                                job['last'])
+            if claimed is not None:
+                _claim(claimed, entry['variant'], entry['files'])
+            if resume and outputs_exist(write, job['first'], job['last']):
+                entry['status'] = 'skipped'
+            else:
+                nuke.execute(job['write'], job['first'], job['last'], 1)
+                entry['status'] = 'rendered'
+    except Exception as err:
+        log.error('Variant %s failed: %s', entry['variant'], err)
+        entry['status'] = 'failed'
+        entry['error'] = str(err)
+    entry['seconds'] = time.time() - start
+    log.info('Variant %s: %s in %.2fs', entry['variant'], entry['status'],
+             entry['seconds'])
+    return entry
+
+
+def _claim(claimed, variant, files):
+    shared = [claimed[path] for path in files if path in claimed]
+    if shared:
+        raise NukeContextError('Output files shared with variant '
+                               '{0}'.format(shared[0]))
+    claimed.update((path, variant) for path in files)
+
+
+def run(script, spec_path, resume=False, cache_dir=None, log=logger):
+    """
+    Open ``script`` and render every variant of the spec at ``spec_path``.
+    Variants rendering to the output files of an earlier variant fail, since
+    they would overwrite its result and be skipped with ``resume``. If the
+    spec can't be loaded or compiled, the report has an ``error`` and no
+    variants.
+
+    :param script: Script path
+    :type script: str
+    :param spec_path: Spec file
+    :type spec_path: str
+    :param resume: Skip variants whose output files exist (default: False)
+    :type resume: bool
+    :param cache_dir: Directory of compiled plans, see
+                      :func:`~nukecontexts.spec.compile_plan`
+                      (default: None)
+    :type cache_dir: str
+    :param log: Logger
+    :type log: logging.Logger
+    :return: Report
+    :rtype: dict
+    """
+    start = time.time()
+    report = {'version': __version__,
+              'script': script,
+              'spec': spec_path,
+              'variants': []}
+    try:
+        nuke.scriptOpen(script)
+        jobs = spec.compile_plan(spec.load(spec_path), script,
+                                 cache_dir=cache_dir, log=log)
+    except Exception as err:
+        log.error('Compiling %s failed: %s', spec_path, err)
+        report['error'] = str(err)
+        jobs = []
+    claimed = {}
+    for job in jobs:
+        report['variants'].append(run_variant(job, resume=resume,
+                                              claimed=claimed, log=log))
+    report['seconds'] = time.time() - start
+    return report
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    :return: Exit code, 1 if the spec couldn't be compiled or any variant
+             failed
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m nukecontexts',
+        description='Render every variant of a spec in a Nuke script.')
+    parser.add_argument('script', help='Nuke script')
+    parser.add_argument('spec', help='Variant spec, JSON or YAML')
+    parser.add_argument('--report', required=True,
+                        help='JSON timing report')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip variants whose output files exist')
+    parser.add_argument('--cache-dir',
+                        help='Directory of compiled plans')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Log every knob value')
+    args = parser.parse_args(argv)
+
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    report = run(args.script, args.spec, resume=args.resume,
+                 cache_dir=args.cache_dir)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    failed = [entry for entry in report['variants']
+              if entry['status'] == 'failed']
+    return 1 if failed or 'error' in report else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
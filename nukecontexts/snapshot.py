@@ -0,0 +1,105 @@
+import json
+
+from nukecontexts import import_nuke
+
+nuke = import_nuke()
+
+
+def default_flags():
+    """
+    :return: :meth:`~nuke.Node.writeKnobs` flags capturing every knob,
+             including animation curves and expressions
+    :rtype: int
+    """
+    return nuke.WRITE_ALL | nuke.TO_SCRIPT
+
+
+class Snapshot(object):
+    """
+    Full knob state of a set of nodes (:class:`~nuke.Node`), captured with one
+    :meth:`~nuke.Node.writeKnobs` call per node and restored with one
+    :meth:`~nuke.Node.readKnobs` call per node.
+
+    Unlike ``knob.value()``, snapshots keep animation curves and expressions.
+
+    Usage:
+
+    >>> snapshot = Snapshot.capture(nodes)
+    >>> # change the script
+    >>> snapshot.restore()
+    """
+    def __init__(self, states):
+        """
+        :param states: Serialised knob state keyed by node
+        :type states: dict
+        """
+        self.states = states
+
+    @classmethod
+    def capture(cls, nodes, flags=None):
+        """
+        :param nodes: Nodes
+        :type nodes: list
+        :param flags: :meth:`~nuke.Node.writeKnobs` flags
+                      (default: :func:`default_flags`)
+        :type flags: int
+        :rtype: Snapshot
+        """
+        if not isinstance(nodes, list):
+            nodes = [nodes]
+        if flags is None:
+            flags = default_flags()
+        return cls(dict((node, node.writeKnobs(flags)) for node in nodes))
+
+    def restore(self, nodes=None):
+        """
+        Restore the captured state.
+
+        :param nodes: Only restore these nodes (default: all nodes)
+        :type nodes: list
+        """
+        if nodes is None:
+            nodes = self.states
+        for node in nodes:
+            node.readKnobs(self.states[node])
+
+    def diff(self, other):
+        """
+        Compare two snapshots without looking at individual knobs.
+
+        :param other: Snapshot
+        :type other: Snapshot
+        :return: Nodes whose state differs or that are only in one snapshot
+        :rtype: list
+        """
+        nodes = set(self.states)
+        nodes.update(other.states)
+        return [node for node in nodes
+                if self.states.get(node) != other.states.get(node)]
+
+    def dumps(self):
+        """
+        :return: JSON serialised snapshot keyed by full node name
+        :rtype: str
+        """
+        return json.dumps(dict((node.fullName(), state)
+                               for node, state in self.states.items()))
+
+    @classmethod
+    def loads(cls, data):
+        """
+        :param data: JSON serialised snapshot, see :meth:`dumps`
+        :type data: str
+        :rtype: Snapshot
+        """
+        from nukecontexts.ctx import NukeContextError
+        states = {}
+        for name, state in json.loads(data).items():
+            node = nuke.toNode(name)
+            if not node:
+                raise NukeContextError('Invalid node \'{0}\''.format(name))
+            states[node] = state
+        return cls(states)
+
+    def __len__(self):
+        return len(self.states)
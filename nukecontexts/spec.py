@@ -0,0 +1,281 @@
+"""
+Declarative variant specs, compiled into validated job descriptions and
+cached on disk, keyed by the content of the script they were compiled
+against.
+
+A spec is a JSON or YAML mapping:
+
+.. code:: yaml
+
+    write: Write1
+    frames: [1, 100]
+    target: Write1          # optional, drop nodes not upstream of it
+    nodes:                  # optional, named node selections
+      grades: {class: Grade, name: 'grade_*'}
+    set:                    # optional, applied to every variant
+      '@grades': {mix: 0.5}
+    axes:                   # optional, every combination is a variant
+      - name: format
+        values:
+          - {label: exr, set: {Write1: {file_type: exr}}}
+          - {label: jpeg, set: {Write1: {file_type: jpeg}}}
+
+Usage:
+
+>>> jobs = spec.compile_plan(spec.load('/path/to/variants.yaml'),
+>>>                          cache_dir='/path/to/cache')
+>>> parallel.render(jobs, workers=8)
+"""
+import os
+import json
+import hashlib
+
+from nukecontexts import (__version__, atomic_write, import_nuke, index,
+                          logger)
+from nukecontexts.ctx import BatchSetter, NukeContextError, validate_value
+from nukecontexts.dag import upstream
+from nukecontexts.matrix import gray_order
+
+nuke = import_nuke()
+
+SPEC_KEYS = frozenset(['write', 'frames', 'target', 'nodes', 'set', 'axes'])
+
+
+def load(path):
+    """
+    Load a spec from a JSON file or, if PyYAML is installed, a YAML file.
+
+    :param path: Spec file, ``.json``, ``.yaml`` or ``.yml``
+    :type path: str
+    :return: Spec
+    :rtype: dict
+    """
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise NukeContextError('PyYAML is required to load '
+                                       '{0}'.format(path))
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    validate(spec)
+    return spec
+
+
+def validate(spec):
+    """
+    Raise :class:`~nukecontexts.ctx.NukeContextError` unless ``spec`` is
+    well-formed. Node names and knobs are only checked when the spec is
+    resolved against a script.
+
+    :param spec: Spec
+    :type spec: dict
+    """
+    if not isinstance(spec, dict):
+        raise NukeContextError('Spec must be a mapping')
+    unknown = set(spec) - SPEC_KEYS
+    if unknown:
+        raise NukeContextError('Unknown spec key(s): {0}'.format(
+            ', '.join(sorted(unknown))))
+    if 'write' not in spec:
+        raise NukeContextError('Spec has no \'write\'')
+    frames = spec.get('frames')
+    if (not isinstance(frames, list) or len(frames) != 2 or
+            not all(isinstance(frame, int) for frame in frames) or
+            frames[0] > frames[1]):
+        raise NukeContextError('Spec \'frames\' must be [first, last]')
+    _validate_assignments(spec.get('set', {}), 'set')
+    for position, axis in enumerate(spec.get('axes', [])):
+        if not isinstance(axis, dict) or not axis.get('values'):
+            raise NukeContextError('Axis {0} has no values'.format(position))
+        for value in axis['values']:
+            if not isinstance(value, dict) or 'set' not in value:
+                raise NukeContextError('Axis {0}: every value needs a '
+                                       '\'set\''.format(position))
+            _validate_assignments(value['set'], 'axis {0}'.format(position))
+
+
+def _validate_assignments(assignments, where):
+    if not isinstance(assignments, dict):
+        raise NukeContextError('{0}: expected a node to {{attr: value}} '
+                               'mapping'.format(where))
+    for values in assignments.values():
+        if not isinstance(values, dict):
+            raise NukeContextError('{0}: expected a node to {{attr: value}} '
+                                   'mapping'.format(where))
+
+
+def script_hash(script):
+    """
+    :param script: Script path
+    :type script: str
+    :return: Hex digest of the script's content
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    with open(script, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def spec_key(spec, script):
+    """
+    :param spec: Spec
+    :type spec: dict
+    :param script: Script path
+    :type script: str
+    :return: Hex digest of the spec, the script's content and the version of
+             ``nukecontexts``
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    digest.update(script_hash(script).encode('utf-8'))
+    digest.update(__version__.encode('utf-8'))
+    digest.update(json.dumps(spec, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _Resolver(object):
+    def __init__(self, spec):
+        self.selections = {}
+        for name, criteria in spec.get('nodes', {}).items():
+            self.selections[name] = index.select(
+                name=criteria.get('name'), cls=criteria.get('class'),
+                knobs=criteria.get('knobs')).nodes()
+        self.upstream = None
+        if spec.get('target'):
+            self.upstream = upstream(self.node(spec['target']))
+
+    def node(self, name):
+        node = index.get_index().get(name)
+        if node is None:
+            raise NukeContextError('Unknown node \'{0}\''.format(name))
+        return node
+
+    def nodes(self, reference):
+        if reference.startswith('@'):
+            try:
+                return self.selections[reference[1:]]
+            except KeyError:
+                raise NukeContextError('Unknown selection \'{0}\''.format(
+                    reference))
+        return [self.node(reference)]
+
+    def assignments(self, assignments):
+        resolved = []
+        for reference, values in sorted(assignments.items()):
+            for node in self.nodes(reference):
+                if self.upstream is not None and node not in self.upstream:
+                    continue
+                for attr, value in sorted(values.items()):
+                    try:
+                        knob = node[attr]
+                    except NameError as err:
+                        raise NukeContextError('Node \'{0}\': {1}'.format(
+                            node.name(), err.args[0]))
+                    validate_value(knob, attr, value)
+                    resolved.append([node.fullName(), attr, value])
+        return resolved
+
+
+def resolve(spec, script=None):
+    """
+    Given a spec, look up and validate every node and knob in the current
+    script and return one job description per variant, in Gray code order
+    so that as few knobs as possible change between consecutive variants.
+    See :func:`~nukecontexts.parallel.describe`.
+
+    :param spec: Spec
+    :type spec: dict
+    :param script: Script path (default: the current script)
+    :type script: str
+    :return: Job descriptions with an added ``variant`` label
+    :rtype: list
+    """
+    validate(spec)
+    if script is None:
+        script = nuke.root().name()
+    resolver = _Resolver(spec)
+    write = resolver.node(spec['write']).fullName()
+    base = resolver.assignments(spec.get('set', {}))
+    axes = spec.get('axes', [])
+    resolved = [[resolver.assignments(value['set'])
+                 for value in axis['values']] for axis in axes]
+    jobs = []
+    for positions in gray_order([len(axis['values']) for axis in axes]):
+        labels = []
+        values = {}
+        order = []
+        for axis, position in zip(axes, positions):
+            default = '{0}{1}'.format(axis.get('name', 'axis'), position)
+            labels.append(str(axis['values'][position].get('label',
+                                                           default)))
+        for assignments in [base] + [resolved[axis][position]
+                                     for axis, position in
+                                     enumerate(positions)]:
+            for name, attr, value in assignments:
+                if (name, attr) not in values:
+                    order.append((name, attr))
+                values[(name, attr)] = value
+        jobs.append({'script': script,
+                     'write': write,
+                     'first': spec['frames'][0],
+                     'last': spec['frames'][1],
+                     'variant': '_'.join(labels) or 'default',
+                     'assignments': [[name, attr, values[(name, attr)]]
+                                     for name, attr in order]})
+    return jobs
+
+
+def compile_plan(spec, script=None, cache_dir=None, log=logger):
+    """
+    :func:`resolve` a spec, reusing the job descriptions compiled by an
+    earlier call for the same spec and script content from ``cache_dir``.
+    On a cache hit no node is looked up, and the jobs' ``script`` is set to
+    ``script``, since the cached plan may come from a copy of it.
+
+    :param spec: Spec
+    :type spec: dict
+    :param script: Script path (default: the current script)
+    :type script: str
+    :param cache_dir: Directory of compiled plans (default: None)
+    :type cache_dir: str
+    :param log: Logger
+    :type log: logging.Logger
+    :return: Job descriptions
+    :rtype: list
+    """
+    if script is None:
+        script = nuke.root().name()
+    if cache_dir is None:
+        return resolve(spec, script)
+    path = os.path.join(cache_dir, '{0}.json'.format(spec_key(spec, script)))
+    if os.path.exists(path):
+        log.info('Loaded compiled plan %s', path)
+        with open(path) as f:
+            jobs = json.load(f)
+        for job in jobs:
+            job['script'] = script
+        return jobs
+    jobs = resolve(spec, script)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    atomic_write(path, json.dumps(jobs, sort_keys=True))
+    log.info('Compiled %d variant(s) into %s', len(jobs), path)
+    return jobs
+
+
+def context(job, **kwargs):
+    """
+    :param job: Job description
+    :type job: dict
+    :param kwargs: Options of :class:`~nukecontexts.ctx.BatchSetter`
+    :return: Context applying the job's knob values in the current script
+    :rtype: :class:`~nukecontexts.ctx.BatchSetter`
+    """
+    return BatchSetter([(nuke.toNode(name), {attr: value})
+                        for name, attr, value in job['assignments']],
+                       **kwargs)
@@ -0,0 +1,185 @@
+"""
+Parameter sweeps over numeric knobs, driven by NumPy arrays of values.
+
+Usage:
+
+>>> values = sweep.linspace([1.0, 1.0, 1.0, 1.0], [2.0, 1.5, 1.0, 1.0], 100)
+>>> with sweep.Sweep(grade, 'white', values) as steps:
+>>>     for step in steps:
+>>>         nuke.execute(write.name(), step.index + 1, step.index + 1, 1)
+
+NumPy is an optional dependency, ``pip install nukecontexts[numpy]``.
+"""
+from collections import namedtuple
+
+from nukecontexts import logger
+from nukecontexts.ctx import NukeContextError, as_list, validate_value
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+Step = namedtuple('Step', ['index', 'value'])
+
+
+def _require_numpy():
+    if numpy is None:
+        raise NukeContextError('NumPy is required for parameter sweeps')
+
+
+def linspace(start, stop, steps):
+    """
+    :param start: First value, a number or one number per channel
+    :type start: float or list
+    :param stop: Last value, a number or one number per channel
+    :type stop: float or list
+    :param steps: Number of steps
+    :type steps: int
+    :return: Evenly spaced values, shaped ``(steps,)`` or
+             ``(steps, channels)``
+    :rtype: numpy.ndarray
+    """
+    _require_numpy()
+    start = numpy.asarray(start, dtype=float)
+    stop = numpy.asarray(stop, dtype=float)
+    fractions = numpy.linspace(0.0, 1.0, steps)
+    fractions = fractions.reshape((steps,) + (1,) * start.ndim)
+    return start + (stop - start) * fractions
+
+
+def grid(*axes):
+    """
+    :param axes: Values of every channel, e.g. ``linspace(-10, 10, 5)`` for
+                 each of x and y
+    :type axes: list
+    :return: Every combination of the axes' values, shaped
+             ``(steps, len(axes))``, the last axis changing fastest
+    :rtype: numpy.ndarray
+    """
+    _require_numpy()
+    mesh = numpy.meshgrid(*[numpy.asarray(axis, dtype=float)
+                            for axis in axes], indexing='ij')
+    return numpy.stack(mesh, axis=-1).reshape(-1, len(axes))
+
+
+def random(low, high, steps, seed=None):
+    """
+    :param low: Lower bound, a number or one number per channel
+    :type low: float or list
+    :param high: Upper bound, a number or one number per channel
+    :type high: float or list
+    :param steps: Number of steps
+    :type steps: int
+    :param seed: Random seed, for reproducible sweeps (default: None)
+    :type seed: int
+    :return: Uniformly sampled values, shaped ``(steps,)`` or
+             ``(steps, channels)``
+    :rtype: numpy.ndarray
+    """
+    _require_numpy()
+    low = numpy.asarray(low, dtype=float)
+    high = numpy.asarray(high, dtype=float)
+    state = numpy.random.RandomState(seed)
+    return state.uniform(low, high, size=(steps,) + low.shape)
+
+
+class Sweep(object):
+    def __init__(self, nodes, attr, values, per_node=False, log=logger):
+        """
+        Given a list of nodes (:class:`~nuke.Node`) and an array of values,
+        set ``attr`` to one value after the other as the steps are iterated.
+        Every knob is looked up and validated once, its original value is
+        saved once on entry and restored once on exit. A knob is only written
+        when its value changes from one step to the next.
+
+        ``values`` is shaped ``(steps,)`` for scalar knobs or
+        ``(steps, channels)`` for array knobs such as ``white`` or
+        ``translate``, and every node gets the same value per step. With
+        ``per_node``, ``values`` has an extra second axis with one value per
+        node, shaped ``(steps, nodes)`` or ``(steps, nodes, channels)``.
+
+        :param nodes: Nodes
+        :type nodes: list
+        :param attr: Attribute
+        :type attr: str
+        :param values: Values
+        :type values: numpy.ndarray or list
+        :param per_node: ``values`` holds one value per node
+                         (default: False)
+        :type per_node: bool
+        :param log: Logger
+        :type log: logging.Logger
+        """
+        _require_numpy()
+        self.nodes = as_list(nodes)
+        self.attr = attr
+        self.values = numpy.asarray(values)
+        self.per_node = per_node
+        self.log = log
+        if per_node and (self.values.ndim < 2 or
+                         self.values.shape[1] != len(self.nodes)):
+            raise NukeContextError('Expected values shaped (steps, {0}, ...), '
+                                   'got {1}'.format(len(self.nodes),
+                                                    self.values.shape))
+        self.knobs = []
+        for node in self.nodes:
+            try:
+                assert node
+            except AssertionError:
+                raise NukeContextError('Invalid node')
+            try:
+                self.knobs.append(node[attr])
+            except NameError as err:
+                raise NukeContextError('Node \'{0}\': {1}'.format(
+                    node.name(), err.args[0]))
+        if len(self.values):
+            first = self.values[0].tolist()
+            for position, knob in enumerate(self.knobs):
+                validate_value(knob, attr,
+                               first[position] if per_node else first)
+        self.writes = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def apply(self, index):
+        """
+        Set every knob to its value at step ``index``.
+
+        :param index: Step
+        :type index: int
+        :return: Values of the step
+        :rtype: float or list
+        """
+        value = self.values[index].tolist()
+        for position, knob in enumerate(self.knobs):
+            knob_value = value[position] if self.per_node else value
+            if self.current[position] != knob_value:
+                knob.setValue(knob_value)
+                self.current[position] = knob_value
+                self.writes += 1
+        return value
+
+    def _iterate(self):
+        for index in range(len(self.values)):
+            yield Step(index, self.apply(index))
+
+    def __enter__(self):
+        """
+        :return: Steps, applied as they are iterated
+        :rtype: generator
+        """
+        self.original = [knob.value() for knob in self.knobs]
+        self.current = list(self.original)
+        self.writes = 0
+        self.log.info('Sweeping %s over %d step(s) on %d node(s)', self.attr,
+                      len(self.values), len(self.knobs))
+        return self._iterate()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for position, knob in enumerate(self.knobs):
+            if self.current[position] != self.original[position]:
+                knob.setValue(self.original[position])
+                self.writes += 1
+        self.log.info('Restored %s after %d write(s)', self.attr, self.writes)
@@ -0,0 +1,658 @@
+"""
+Lightweight, in-process stand-in for the ``nuke`` module, for benchmarks and
+tests outside of Nuke.
+
+Usage:
+
+>>> import os
+>>> os.environ['NON_PRODUCTION_CONTEXT'] = '1'
+>>> from nukecontexts import testing
+>>> nuke = testing.install(latency={'setValue': 0.00001})
+>>> from nukecontexts import ctx
+
+:func:`install` must be called before :mod:`nukecontexts.ctx` is imported.
+Only the parts of the ``nuke`` API used by ``nukecontexts`` are provided.
+"""
+import os
+import re
+import sys
+import time
+import threading
+
+try:
+    string_types = (basestring,)
+except NameError:
+    string_types = (str,)
+
+NUKE_VERSION_STRING = '0.0v0'
+
+#: ``gui`` is ``False`` to stand in for ``nuke -t``
+env = {'gui': True}
+
+WRITE_ALL = 1
+WRITE_NON_DEFAULT_ONLY = 2
+WRITE_USER_KNOB_DEFS = 4
+TO_SCRIPT = 8
+TO_VALUE = 16
+
+INPUTS = 1
+HIDDEN_INPUTS = 2
+EXPRESSIONS = 4
+
+KNOBS = {
+    '*': [('disable', 'Boolean_Knob', False)],
+    'Write': [('file', 'File_Knob', ''),
+              ('file_type', 'Enumeration_Knob', 'exr'),
+              ('channels', 'ChannelMask_Knob', 'rgb')],
+    'Grade': [('white', 'AColor_Knob', 1.0),
+              ('mix', 'Double_Knob', 1.0)],
+    'Transform': [('translate', 'XY_Knob', [0.0, 0.0])],
+    'Switch': [('which', 'Int_Knob', 0)],
+    'Root': [('format', 'Format_Knob', 'HD_1080'),
+             ('fps', 'Double_Knob', 24.0),
+             ('colorManagement', 'Enumeration_Knob', 'Nuke'),
+             ('OCIO_config', 'Enumeration_Knob', 'nuke-default')],
+}
+
+EXPRESSION_PATTERN = re.compile(r'([A-Za-z_]\w*)\.\w+')
+FRAME_PATTERN = re.compile(r'%0?(\d*)d|(#+)')
+
+#: Per-call latency in seconds, keyed by operation name
+#: (``value``, ``setValue``, ``allNodes``, ``createNode``, ``execute``)
+latency = {}
+
+#: Return a new wrapper object from every ``node[name]``, as Nuke does, so
+#: memory measurements count the knob handles held by contexts
+knob_wrappers = False
+
+_nodes = []
+_counts = {}
+_on_create = []
+_on_destroy = []
+_this = {'node': None, 'knob': None}
+_groups = []
+
+
+def _wait(operation):
+    seconds = latency.get(operation)
+    if seconds:
+        end = time.time() + seconds
+        while time.time() < end:
+            pass
+
+
+class _Callbacks(object):
+    """
+    Stand-in for ``nuke.callbacks``, holding the registered ``knobChanged``
+    and ``updateUI`` callbacks by node class.
+    """
+    def __init__(self):
+        self.knobChangeds = {}
+        self.updateUIs = {}
+        self.autolabels = {}
+        self.beforeFrameRenders = {}
+        self.afterFrameRenders = {}
+
+
+callbacks = _Callbacks()
+
+
+def _add_callback(registry, callback, args, kwargs, nodeClass):
+    registry.setdefault(nodeClass, []).append(
+        (callback, args, kwargs, nodeClass))
+
+
+def _remove_callback(registry, callback, args, kwargs, nodeClass):
+    registry[nodeClass].remove((callback, args, kwargs, nodeClass))
+
+
+def _run_callbacks(registry, node):
+    if not registry:
+        return
+    _this['node'] = node
+    for cls in ('*', node.Class()):
+        for callback, args, kwargs, _ in list(registry.get(cls, [])):
+            callback(*args, **kwargs)
+
+
+def _knob_changed(node, knob):
+    # As in Nuke, only for nodes with an open control panel and never
+    # without a GUI
+    if not (env['gui'] and node._shown):
+        return
+    _this['knob'] = knob
+    _run_callbacks(callbacks.knobChangeds, node)
+
+
+class Undo(object):
+    """
+    Stand-in for ``nuke.Undo``.
+    """
+    _disabled = False
+
+    @classmethod
+    def disable(cls):
+        cls._disabled = True
+
+    @classmethod
+    def enable(cls):
+        cls._disabled = False
+
+    @classmethod
+    def disabled(cls):
+        return cls._disabled
+
+
+class Knob(object):
+    def __init__(self, name, cls='Knob', value=None):
+        self._name = name
+        self._class = cls
+        self._value = value
+        self._node = None
+        self._expression = None
+
+    def name(self):
+        return self._name
+
+    def Class(self):
+        return self._class
+
+    def value(self):
+        _wait('value')
+        return self._value
+
+    def setValue(self, value):
+        _wait('setValue')
+        if self._class == 'Enumeration_Knob':
+            if (not isinstance(value, string_types + (int,)) or
+                    isinstance(value, bool)):
+                raise TypeError('Expected string or int for \'{0}\''.format(
+                    self._name))
+        self._value = value
+        if self._node is not None:
+            _knob_changed(self._node, self)
+        return True
+
+    def setExpression(self, expression, channel=-1):
+        self._expression = expression
+        if self._node is not None:
+            _knob_changed(self._node, self)
+        return True
+
+    def clearAnimated(self):
+        self._expression = None
+        if self._node is not None:
+            _knob_changed(self._node, self)
+        return True
+
+    def hasExpression(self):
+        return self._expression is not None
+
+    def toScript(self):
+        if self._expression is not None:
+            return '{{{0}}}'.format(self._expression)
+        return repr(self._value)
+
+    def fromScript(self, script):
+        import ast
+        if script.startswith('{') and script.endswith('}'):
+            self._expression = script[1:-1]
+            return True
+        self._expression = None
+        self._value = ast.literal_eval(script)
+        return True
+
+
+class _KnobWrapper(object):
+    __slots__ = ('_knob',)
+
+    def __init__(self, knob):
+        self._knob = knob
+
+    def __getattr__(self, name):
+        return getattr(self._knob, name)
+
+
+class _NodeWrapper(object):
+    """
+    New Python object for an existing node, equal to it, as Nuke returns
+    from every :func:`thisNode` call.
+    """
+    __slots__ = ('_node',)
+
+    def __init__(self, node):
+        self._node = node
+
+    def __getattr__(self, name):
+        return getattr(self._node, name)
+
+    def __getitem__(self, name):
+        return self._node[name]
+
+    def __eq__(self, other):
+        return _unwrap(other) is self._node
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._node)
+
+    def __repr__(self):
+        return repr(self._node)
+
+
+def _unwrap(node):
+    if isinstance(node, _NodeWrapper):
+        return node._node
+    return node
+
+
+class Node(object):
+    def __init__(self, cls, name):
+        self._class = cls
+        self._knobs = {}
+        for knob_name, knob_class, value in KNOBS['*'] + KNOBS.get(cls, []):
+            self.addKnob(Knob(knob_name, knob_class, value))
+        self._name = name
+        self._inputs = []
+        self._deleted = False
+        self._parent = None
+        self._shown = False
+
+    def __getitem__(self, name):
+        try:
+            knob = self._knobs[name]
+        except KeyError:
+            raise NameError('knob {0} does not exist'.format(name))
+        if knob_wrappers:
+            return _KnobWrapper(knob)
+        return knob
+
+    def __nonzero__(self):
+        return True
+
+    __bool__ = __nonzero__
+
+    def __repr__(self):
+        return '<Node {0}>'.format(self._name)
+
+    def addKnob(self, knob):
+        knob._node = self
+        self._knobs[knob.name()] = knob
+
+    def knobs(self):
+        return dict(self._knobs)
+
+    def _check(self):
+        if self._deleted:
+            raise ValueError('A PythonObject is not attached to a node')
+
+    def name(self):
+        self._check()
+        return self._name
+
+    def setName(self, name):
+        self._check()
+        self._name = name
+        _knob_changed(self, Knob('name'))
+
+    def fullName(self):
+        self._check()
+        if self._parent is not None:
+            return '{0}.{1}'.format(self._parent.fullName(), self._name)
+        return self._name
+
+    def Class(self):
+        return self._class
+
+    def showControlPanel(self):
+        self._shown = True
+
+    def hideControlPanel(self):
+        self._shown = False
+
+    def shown(self):
+        return self._shown
+
+    def input(self, index):
+        try:
+            return self._inputs[index]
+        except IndexError:
+            return None
+
+    def inputs(self):
+        return len(self._inputs)
+
+    def setInput(self, index, node):
+        node = _unwrap(node)
+        self._inputs.extend([None] * (index + 1 - len(self._inputs)))
+        self._inputs[index] = node
+        _knob_changed(self, Knob('inputChange'))
+        return True
+
+    def dependencies(self, what=INPUTS | HIDDEN_INPUTS | EXPRESSIONS):
+        nodes = []
+        if what & INPUTS:
+            nodes.extend(node for node in self._inputs if node is not None)
+        if what & EXPRESSIONS:
+            for knob in self._knobs.values():
+                for name in EXPRESSION_PATTERN.findall(knob._expression or ''):
+                    node = toNode(name)
+                    if node is not None and node not in nodes:
+                        nodes.append(node)
+        return nodes
+
+    def writeKnobs(self, flags):
+        return '\n'.join('{0} {1}'.format(name, knob.toScript())
+                         for name, knob in sorted(self._knobs.items()))
+
+    def readKnobs(self, script):
+        for line in script.splitlines():
+            name, value = line.split(' ', 1)
+            self[name].fromScript(value)
+
+
+class Group(Node):
+    """
+    Stand-in for ``nuke.Group``, holding the nodes created between
+    :meth:`begin` and :meth:`end`.
+    """
+    def __init__(self, cls, name):
+        Node.__init__(self, cls, name)
+        self._children = []
+
+    def nodes(self):
+        self._check()
+        return list(self._children)
+
+    def begin(self):
+        _groups.append(self)
+        return self
+
+    def end(self):
+        _groups.remove(self)
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end()
+
+
+class Gizmo(Group):
+    pass
+
+
+class _Root(Node):
+    def __init__(self):
+        Node.__init__(self, 'Root', 'Root')
+        del self._knobs['disable']
+
+
+_root = _Root()
+
+
+def _current_group():
+    return _groups[-1] if _groups else None
+
+
+def _inside(node, group):
+    parent = node._parent
+    while parent is not None:
+        if parent is group:
+            return True
+        parent = parent._parent
+    return group is None
+
+
+def root():
+    return _root
+
+
+def createNode(node, knobs='', inpanel=True):
+    _wait('createNode')
+    _counts[node] = _counts.get(node, 0) + 1
+    cls = {'Group': Group, 'Gizmo': Gizmo}.get(node, Node)
+    new = cls(node, '{0}{1}'.format(node, _counts[node]))
+    new._parent = _current_group()
+    if new._parent is not None:
+        new._parent._children.append(new)
+    _nodes.append(new)
+    if inpanel:
+        new.showControlPanel()
+    _this['node'] = new
+    for callback in list(_on_create):
+        callback()
+    return new
+
+
+class _Nodes(object):
+    def __getattr__(self, cls):
+        def create(name=None, **knobs):
+            node = createNode(cls, inpanel=False)
+            if name:
+                node.setName(name)
+            for knob, value in knobs.items():
+                node[knob].setValue(value)
+            return node
+        return create
+
+
+nodes = _Nodes()
+
+
+def allNodes(filter=None, group=None, recurseGroups=False):
+    _wait('allNodes')
+    if group is None:
+        group = _current_group()
+    if recurseGroups:
+        nodes = [node for node in _nodes if _inside(node, group)]
+    else:
+        nodes = [node for node in _nodes if node._parent is group]
+    if filter:
+        return [node for node in nodes if node.Class() == filter]
+    return nodes
+
+
+def toNode(name):
+    for node in _nodes:
+        if node.fullName() == name:
+            return node
+    return None
+
+
+def delete(node):
+    node = _unwrap(node)
+    if isinstance(node, Group):
+        for child in node.nodes():
+            delete(child)
+    _this['node'] = node
+    for callback in list(_on_destroy):
+        callback()
+    _nodes.remove(node)
+    if node._parent is not None:
+        node._parent._children.remove(node)
+    node._deleted = True
+
+
+def clear():
+    """
+    Delete all nodes and callbacks.
+    """
+    global _root
+    del _nodes[:]
+    del _groups[:]
+    _root = _Root()
+    del _on_create[:]
+    del _on_destroy[:]
+    callbacks.knobChangeds.clear()
+    callbacks.updateUIs.clear()
+    callbacks.autolabels.clear()
+    callbacks.beforeFrameRenders.clear()
+    callbacks.afterFrameRenders.clear()
+    Undo.enable()
+    env['gui'] = True
+    del executed[:]
+    del marshalled[:]
+    _counts.clear()
+    _this['node'] = None
+
+
+#: Renders made with :func:`execute`, as ``(name, first, last, incr)``
+executed = []
+
+
+def _frame_path(path, frame):
+    def replace(match):
+        width = len(match.group(2) or '') or int(match.group(1) or 0)
+        return str(frame).zfill(width)
+    return FRAME_PATTERN.sub(replace, path)
+
+
+def execute(node, first, last, incr=1):
+    """
+    Simulate a render, writing an empty file per frame if the node has a
+    ``file`` knob.
+    """
+    if not isinstance(node, Node):
+        node = toNode(node)
+    executed.append((node.name(), first, last, incr))
+    path = node.knobs().get('file') and node['file'].value()
+    for frame in range(first, last + 1, incr):
+        _run_callbacks(callbacks.beforeFrameRenders, node)
+        _wait('execute')
+        if path:
+            output = _frame_path(path, frame)
+            if not os.path.isdir(os.path.dirname(output)):
+                os.makedirs(os.path.dirname(output))
+            open(output, 'w').close()
+        _run_callbacks(callbacks.afterFrameRenders, node)
+
+
+#: Callables run with :func:`executeInMainThreadWithResult`
+marshalled = []
+_main_thread_lock = threading.Lock()
+
+
+def executeInMainThreadWithResult(call, args=(), kwargs={}):
+    """
+    Run ``call`` under a lock in the calling thread, recording it in
+    :data:`marshalled`.
+    """
+    with _main_thread_lock:
+        marshalled.append(call)
+        return call(*args, **kwargs)
+
+
+def executeInMainThread(call, args=(), kwargs={}):
+    executeInMainThreadWithResult(call, args, kwargs)
+
+
+def filename(node, type=None):
+    """
+    :return: Value of the node's ``file`` knob, ``None`` if it has none
+    """
+    if 'file' not in node.knobs():
+        return None
+    return node['file'].value() or None
+
+
+def scriptOpen(path):
+    _root._name = path
+
+
+def warning(message):
+    pass
+
+
+def addOnCreate(callback, args=(), kwargs={}, nodeClass='*'):
+    _on_create.append(callback)
+
+
+def removeOnCreate(callback, args=(), kwargs={}, nodeClass='*'):
+    _on_create.remove(callback)
+
+
+def addOnDestroy(callback, args=(), kwargs={}, nodeClass='*'):
+    _on_destroy.append(callback)
+
+
+def removeOnDestroy(callback, args=(), kwargs={}, nodeClass='*'):
+    _on_destroy.remove(callback)
+
+
+def addKnobChanged(callback, args=(), kwargs={}, nodeClass='*'):
+    _add_callback(callbacks.knobChangeds, callback, args, kwargs, nodeClass)
+
+
+def removeKnobChanged(callback, args=(), kwargs={}, nodeClass='*'):
+    _remove_callback(callbacks.knobChangeds, callback, args, kwargs,
+                     nodeClass)
+
+
+def addBeforeFrameRender(callback, args=(), kwargs={}, nodeClass='Write'):
+    _add_callback(callbacks.beforeFrameRenders, callback, args, kwargs,
+                  nodeClass)
+
+
+def removeBeforeFrameRender(callback, args=(), kwargs={}, nodeClass='Write'):
+    _remove_callback(callbacks.beforeFrameRenders, callback, args, kwargs,
+                     nodeClass)
+
+
+def addAfterFrameRender(callback, args=(), kwargs={}, nodeClass='Write'):
+    _add_callback(callbacks.afterFrameRenders, callback, args, kwargs,
+                  nodeClass)
+
+
+def removeAfterFrameRender(callback, args=(), kwargs={}, nodeClass='Write'):
+    _remove_callback(callbacks.afterFrameRenders, callback, args, kwargs,
+                     nodeClass)
+
+
+def dependencies(nodes, what=INPUTS | HIDDEN_INPUTS | EXPRESSIONS):
+    if not isinstance(nodes, list):
+        nodes = [nodes]
+    upstream = []
+    for node in nodes:
+        for dependency in node.dependencies(what):
+            if dependency not in upstream:
+                upstream.append(dependency)
+    return upstream
+
+
+def thisKnob():
+    return _this['knob']
+
+
+def thisNode():
+    node = _this['node']
+    if node is None:
+        return None
+    return _NodeWrapper(node)
+
+
+def thisGroup():
+    return _current_group() or _root
+
+
+def thisParent():
+    return _current_group() or _root
+
+
+def install(latency=None):
+    """
+    Install this module as ``nuke`` in :data:`sys.modules`.
+
+    :param latency: Per-call latency in seconds, keyed by operation name
+    :type latency: dict
+    :return: Fake ``nuke`` module
+    :rtype: module
+    """
+    module = sys.modules[__name__]
+    if latency is not None:
+        module.latency.clear()
+        module.latency.update(latency)
+    sys.modules['nuke'] = module
+    return module
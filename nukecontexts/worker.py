@@ -0,0 +1,27 @@
+"""
+Headless render worker for :mod:`nukecontexts.parallel`.
+
+Usage:
+
+    $ nuke -t worker.py job.json
+"""
+import sys
+import json
+
+
+def main(argv):
+    with open(argv[0]) as f:
+        job = json.load(f)
+
+    import nuke
+    from nukecontexts import ctx
+
+    nuke.scriptOpen(job['script'])
+    assignments = [(nuke.toNode(name), {attr: value})
+                   for name, attr, value in job['assignments']]
+    with ctx.BatchSetter(assignments):
+        nuke.execute(job['write'], job['first'], job['last'], 1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -31,5 +31,6 @@ setup(
         'Programming Language :: Python :: Implementation :: CPython',
     ],
     install_requires=requirements,
+    extras_require={'numpy': ['numpy'], 'yaml': ['PyYAML']},
     tests_require=test_requirements
 )
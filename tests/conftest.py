@@ -1,11 +1,51 @@
-import nuke
+import os
 import pytest
 
+try:
+    import nuke
+except ImportError:
+    os.environ.setdefault('NON_PRODUCTION_CONTEXT', '1')
+    from nukecontexts import testing
+    testing.install()
+
+
 @pytest.fixture(scope='session')
 def nuke():
     import nuke
     return nuke
 
+
 @pytest.fixture(scope='session')
+def fake_nuke(nuke):
+    """
+    The fake ``nuke`` module of :mod:`nukecontexts.testing`, tests using it
+    are skipped inside Nuke.
+    """
+    from nukecontexts import testing
+    if nuke is not testing:
+        pytest.skip('Requires nukecontexts.testing')
+    return nuke
+
+
+@pytest.fixture(scope='module', autouse=True)
+def clear(nuke):
+    """
+    Start every test module with an empty fake script.
+    """
+    from nukecontexts import dag, index, testing
+    dag.get_index().close()
+    index.get_index().close()
+    if nuke is testing:
+        testing.clear()
+
+
+@pytest.fixture(autouse=True)
+def dag_index():
+    yield
+    from nukecontexts import dag
+    dag.get_index().close()
+
+
+@pytest.fixture(scope='module')
 def node(nuke):
     return nuke.nodes.Write(name='test_write')
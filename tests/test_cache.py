@@ -0,0 +1,73 @@
+import pytest
+from nukecontexts import ctx
+from nukecontexts.cache import RenderCache, frame_path, state_key
+
+
+def test_frame_path():
+    assert frame_path('/out/beauty.####.exr', 12) == '/out/beauty.0012.exr'
+    assert frame_path('/out/beauty.%04d.exr', 3) == '/out/beauty.0003.exr'
+    assert frame_path('/out/beauty.%d.exr', 3) == '/out/beauty.3.exr'
+
+
+@pytest.fixture
+def render(nuke, tmpdir):
+    grade = nuke.nodes.Grade()
+    write = nuke.nodes.Write()
+    write.setInput(0, grade)
+    write['file'].setValue(str(tmpdir.join('out', 'beauty.####.exr')))
+    return grade, write
+
+
+def test_render_cache(nuke, tmpdir, render):
+    grade, write = render
+    cache = RenderCache(str(tmpdir.join('cache.json')))
+    assert cache.execute(write, 1, 2)
+    assert not cache.execute(write, 1, 2)
+    assert tmpdir.join('out', 'beauty.0002.exr').check()
+
+    with ctx.set_attr(grade, 'mix', 0.5):
+        assert cache.execute(write, 1, 2)
+        assert not cache.execute(write, 1, 2)
+    assert cache.stats == {'hits': 2, 'misses': 2, 'evictions': 0}
+
+    # The variant above overwrote the first render's files
+    assert cache.execute(write, 1, 2)
+    assert not cache.execute(write, 1, 2)
+
+    tmpdir.join('out', 'beauty.0001.exr').remove()
+    assert cache.execute(write, 1, 2)
+    tmpdir.join('out', 'beauty.0002.exr').write('changed')
+    assert cache.execute(write, 1, 2)
+
+    reloaded = RenderCache(str(tmpdir.join('cache.json')))
+    assert not reloaded.execute(write, 1, 2)
+
+
+def test_render_cache_eviction(nuke, tmpdir, render):
+    grade, write = render
+    cache = RenderCache(str(tmpdir.join('cache.json')), max_entries=1)
+    cache.execute(write, 1, 1)
+    cache.execute(write, 2, 2)
+    assert len(cache.entries) == 1
+    assert cache.stats['evictions'] == 1
+
+    cache.max_age = 60
+    created = max(entry['created'] for entry in cache.entries.values())
+    cache.evict(now=created + 61)
+    assert cache.entries == {}
+    assert cache.stats['evictions'] == 2
+
+
+def test_state_key(nuke, render):
+    grade, write = render
+    group = nuke.nodes.Group()
+    with group:
+        inner = nuke.nodes.Grade()
+    grade.setInput(0, group)
+    key = state_key(write, 1, 2)
+
+    with ctx.set_attr(inner, 'mix', 0.5):
+        assert state_key(write, 1, 2) != key
+    with ctx.set_attr(nuke.root(), 'fps', 25.0):
+        assert state_key(write, 1, 2) != key
+    assert state_key(write, 1, 2) == key
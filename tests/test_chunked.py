@@ -0,0 +1,71 @@
+import io
+import os
+import sys
+import pytest
+from nukecontexts import chunked, ctx, parallel
+
+STAND_IN = '''
+import os
+import sys
+import json
+
+with open(sys.argv[1]) as f:
+    job = json.load(f)
+if str(job['first']) == os.environ.get('FAIL_FIRST'):
+    sys.exit(1)
+'''
+
+
+def test_frame_chunks():
+    assert chunked.frame_chunks(1, 10, 4) == [(1, 4), (5, 8), (9, 10)]
+    assert chunked.frame_chunks(1, 1, 10) == [(1, 1)]
+    with pytest.raises(ValueError):
+        chunked.frame_chunks(1, 10, 0)
+
+
+def test_execute(nuke, tmpdir, monkeypatch):
+    write = nuke.nodes.Write(file=str(tmpdir.join('out.####.exr')))
+    grade = nuke.nodes.Grade()
+    write.setInput(0, grade)
+    checkpoint = str(tmpdir.join('chunks.json'))
+    execute = nuke.execute
+
+    def fail(name, first, last, incr=1):
+        if first == 7:
+            raise RuntimeError('Render failed')
+        execute(name, first, last, incr)
+
+    monkeypatch.setattr(nuke, 'execute', fail)
+    with ctx.set_attr(grade, 'mix', 0.5):
+        with pytest.raises(RuntimeError):
+            chunked.execute(write, 1, 10, chunk_size=3,
+                            checkpoint=checkpoint)
+    assert os.path.exists(checkpoint)
+
+    monkeypatch.setattr(nuke, 'execute', execute)
+    output = io.StringIO()
+    with ctx.set_attr(grade, 'mix', 0.5):
+        rendered = chunked.execute(write, 1, 10, chunk_size=3,
+                                   checkpoint=checkpoint, progress=True,
+                                   output=output)
+    assert rendered == [(7, 9), (10, 10)]
+    assert 'frame' in output.getvalue()
+    assert not os.path.exists(checkpoint)
+
+
+def test_render(node, tmpdir, monkeypatch):
+    worker = tmpdir.join('worker.py')
+    worker.write(STAND_IN)
+    checkpoint = str(tmpdir.join('chunks.json'))
+    job = parallel.describe([], node, 1, 10, script='/tmp/test.nk')
+    options = dict(chunk_size=4, workers=2, checkpoint=checkpoint,
+                   executable=[sys.executable], worker=str(worker))
+
+    monkeypatch.setenv('FAIL_FIRST', '5')
+    with pytest.raises(parallel.RenderError):
+        chunked.render(job, **options)
+    monkeypatch.delenv('FAIL_FIRST')
+    results = chunked.render(job, **options)
+    assert [(result.job['first'], result.job['last'])
+            for result in results] == [(5, 8)]
+    assert not os.path.exists(checkpoint)
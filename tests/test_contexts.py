@@ -1,4 +1,6 @@
+import logging
 import pytest
+import nukecontexts
 from nukecontexts import ctx
 
 
@@ -72,3 +74,306 @@ def test_inventory(nuke):
             nuke.createNode('Write', inpanel=False)
     assert len(new_nodes) == 3
     assert any([node for node in new_nodes if node.Class() == 'Write'])
+
+
+def test_set_attrs(nuke, node):
+    other = nuke.nodes.Write(name='test_write_batch')
+    node['file_type'].setValue('exr')
+    other['file_type'].setValue('exr')
+
+    with ctx.set_attrs({node: {'file_type': 'jpeg', 'channels': 'rgba'},
+                        other: {'file_type': 'png'}}):
+        assert node['file_type'].value() == 'jpeg'
+        assert node['channels'].value() == 'rgba'
+        assert other['file_type'].value() == 'png'
+    assert node['file_type'].value() == 'exr'
+    assert node['channels'].value() == 'rgb'
+    assert other['file_type'].value() == 'exr'
+
+    with ctx.set_attrs(([node, other], {'disable': True})):
+        assert node['disable'].value()
+        assert other['disable'].value()
+    assert not node['disable'].value()
+    assert not other['disable'].value()
+
+
+def test_skip_unchanged(node):
+    node['file_type'].setValue('exr')
+    setter = ctx.AttributeSetter(node, 'file_type', 'exr',
+                                 skip_unchanged=True)
+    with setter:
+        assert node['file_type'].value() == 'exr'
+        assert setter.skipped == 1
+        assert setter.enter_values == {}
+
+    batch = ctx.BatchSetter({node: {'file_type': 'exr', 'disable': True}},
+                            skip_unchanged=True)
+    with batch:
+        assert node['disable'].value()
+        assert batch.skipped == 1
+        assert list(batch.enter_values.keys()) == [(node, 'disable')]
+    assert not node['disable'].value()
+
+
+def test_inventory_value(nuke):
+    received = []
+    with ctx.inventory(callback=received.extend) as new_nodes:
+        for i in range(2):
+            nuke.createNode('Grade', inpanel=False)
+    assert len(new_nodes) == 2
+    assert received == new_nodes
+
+    with ctx.inventory(use_callbacks=False) as new_nodes:
+        nuke.createNode('Write', inpanel=False)
+    assert len(new_nodes) == 1
+    assert new_nodes[0].Class() == 'Write'
+
+
+def test_plan(node):
+    node['disable'].setValue(False)
+    node['file_type'].setValue('exr')
+    plan = ctx.Plan([ctx.AttributeSetter(node, 'file_type', 'jpeg'),
+                     ctx.AttributeSetter(node, 'disable', True),
+                     ctx.AttributeSetter(node, 'file_type', 'png')])
+    assert len(plan.assignments) == 2
+
+    for _ in range(2):
+        with plan:
+            assert node['disable'].value()
+            assert node['file_type'].value() == 'png'
+            assert len(plan.saved) == 2
+        assert not node['disable'].value()
+        assert node['file_type'].value() == 'exr'
+
+    with pytest.raises(ctx.NukeContextError):
+        ctx.Plan([ctx.inventory()])
+
+
+def test_reenter(node):
+    node['disable'].setValue(False)
+    context = ctx.disabled(node)
+    for _ in range(3):
+        with context:
+            assert node['disable'].value()
+        assert not node['disable'].value()
+
+    with pytest.raises(ctx.NukeContextError):
+        ctx.set_attr(node, 'invalid_attr', True)
+
+
+def test_nested_reenter(nuke):
+    grade = nuke.nodes.Grade()
+    context = ctx.set_attr(grade, 'mix', 0.5)
+    with context:
+        with pytest.raises(ctx.NukeContextError):
+            with context:
+                pass
+        assert grade['mix'].value() == 0.5
+    assert grade['mix'].value() == 1.0
+    with context:
+        assert grade['mix'].value() == 0.5
+    assert grade['mix'].value() == 1.0
+
+
+def test_validation(nuke):
+    grade = nuke.nodes.Grade()
+    with pytest.raises(ctx.NukeContextError):
+        ctx.set_attr(grade, 'mix', 'full')
+    with pytest.raises(ctx.NukeContextError):
+        ctx.set_attr(grade, 'disable', 'yes')
+    ctx.set_attr(grade, 'white', [1.0, 0.5, 0.5, 1.0])
+    # long on Python 2
+    ctx.set_attr(grade, 'mix', 2 ** 64)
+    ctx.set_attr(nuke.nodes.Switch(), 'which', 2 ** 64)
+
+
+def test_rollback(nuke, monkeypatch):
+    nodes = [nuke.nodes.Grade() for _ in range(3)]
+    failing = nodes[2]['mix']
+
+    def fail(value):
+        raise ValueError('Cannot set mix')
+
+    setter = ctx.set_attr(nodes, 'mix', 0.5)
+    monkeypatch.setattr(failing, 'setValue', fail)
+    with pytest.raises(ctx.NukeContextError):
+        with setter:
+            pass
+    assert [node['mix'].value() for node in nodes] == [1.0, 1.0, 1.0]
+
+
+def test_suppress_callbacks(nuke, monkeypatch):
+    grades = [nuke.nodes.Grade() for _ in range(3)]
+    # knobChanged only runs for nodes with an open control panel
+    for grade in grades:
+        grade.showControlPanel()
+    changed = []
+    notified = []
+
+    def callback():
+        changed.append(nuke.thisNode())
+
+    def added():
+        pass
+
+    nuke.addKnobChanged(callback, nodeClass='Grade')
+    try:
+        with ctx.set_attr(grades, 'mix', 0.5):
+            pass
+        assert len(changed) == 6
+
+        del changed[:]
+        knob = grades[0]['mix']
+        set_value = knob.setValue
+
+        def register(value):
+            # Registered while the other callbacks are detached
+            if not registered:
+                assert 'Grade' not in nuke.callbacks.knobChangeds
+                assert nuke.Undo.disabled()
+                nuke.addKnobChanged(added, nodeClass='Grade')
+                registered.append(added)
+            return set_value(value)
+
+        registered = []
+        monkeypatch.setattr(knob, 'setValue', register)
+        with ctx.set_attr(grades, 'mix', 0.5, suppress_callbacks=True,
+                          notify=notified.append):
+            assert not nuke.Undo.disabled()
+        assert registered
+        assert not changed
+        assert notified == [grades, grades]
+        assert [entry[0] for entry in
+                nuke.callbacks.knobChangeds['Grade']] == [callback, added]
+    finally:
+        nuke.removeKnobChanged(callback, nodeClass='Grade')
+        nuke.removeKnobChanged(added, nodeClass='Grade')
+
+
+@pytest.mark.usefixtures('fake_nuke')
+def test_main_thread(nuke, monkeypatch):
+    import threading
+    grades = [nuke.nodes.Grade() for _ in range(3)]
+    calls = len(nuke.marshalled)
+    errors = []
+
+    def worker():
+        try:
+            context = ctx.set_attr(grades, 'mix', 0.5, main_thread=True)
+            with context:
+                assert [grade['mix'].value() for grade in grades] == \
+                    [0.5, 0.5, 0.5]
+            assert context.enter_values == dict(
+                (grade, 1.0) for grade in grades)
+
+            def fail(value):
+                raise ValueError('Cannot set mix')
+            monkeypatch.setattr(grades[1]['mix'], 'setValue', fail)
+            with pytest.raises(ctx.NukeContextError):
+                with ctx.set_attr(grades, 'mix', 0.5, main_thread=True):
+                    pass
+        except Exception as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert not errors
+    # Lookup, entry and exit, then lookup and failed entry
+    assert len(nuke.marshalled) - calls == 5
+    assert [grade['mix'].value() for grade in grades] == [1.0, 1.0, 1.0]
+
+
+def test_logging(nuke):
+    import logging
+    grades = [nuke.nodes.Grade() for _ in range(3)]
+    records = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            records.append(record)
+
+    log = logging.getLogger('nukecontexts.tests')
+    log.addHandler(Handler())
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    with ctx.set_attr(grades, 'mix', 0.5, log=log):
+        pass
+    assert [record.nukecontexts['action'] for record in records] == \
+        ['entered', 'restored']
+    assert records[0].nukecontexts['values'] == 3
+    assert records[0].nukecontexts['knobs'] == ['mix']
+
+    del records[:]
+    log.setLevel(logging.DEBUG)
+    with ctx.set_attr(grades, 'mix', 0.5, log=log):
+        pass
+    assert len(records) == 8
+    assert records[0].getMessage() == 'Entering context: ({0}|mix|0.5)'.format(
+        grades[0].name())
+
+
+def test_frame_progress(nuke):
+    import io
+    import logging
+    write = nuke.nodes.Write()
+    variants = [ctx.set_attr(write, 'file_type', value)
+                for value in ('exr', 'jpeg')]
+    records = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    log = logging.getLogger('nukecontexts.tests.progress')
+    log.addHandler(Handler())
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    progress = ctx.FrameProgress(variants, frames=3, name='batch',
+                                 output=io.StringIO(), log_interval=0, log=log)
+    with progress as iterator:
+        for variant in iterator:
+            with variant:
+                nuke.execute(write, 1, 3)
+    assert progress.rendered == 6
+    assert records[-2].startswith('batch: variant 2/2, frame 6/6')
+    assert not nuke.callbacks.afterFrameRenders.get('Write')
+
+    class Terminal(io.StringIO):
+        def isatty(self):
+            return True
+
+    output = Terminal()
+    with ctx.FrameProgress(variants, frames=3, output=output) as iterator:
+        for variant in iterator:
+            with variant:
+                nuke.execute(write, 1, 3)
+    assert '6/6' in output.getvalue()
+
+
+def test_deferred_handler():
+    log = logging.getLogger('nukecontexts.tests.deferred')
+    records = []
+    custom = logging.Handler()
+    custom.emit = records.append
+    log.handlers = [nukecontexts.DeferredHandler(log.name), custom]
+    log.setLevel(logging.WARNING)
+    log.propagate = False
+    try:
+        log.warning('first')
+        log.info('ignored')
+        assert log.handlers[1] is custom
+        assert isinstance(log.handlers[0], logging.StreamHandler)
+        assert log.level == logging.WARNING
+        assert [record.getMessage() for record in records] == ['first']
+    finally:
+        log.handlers = []
+
+
+def test_atomic_write(tmpdir):
+    path = str(tmpdir.join('file.json'))
+    nukecontexts.atomic_write(path, 'old')
+    nukecontexts.atomic_write(path, 'new')
+    with open(path) as f:
+        assert f.read() == 'new'
+    assert tmpdir.listdir() == [tmpdir.join('file.json')]
@@ -0,0 +1,80 @@
+from nukecontexts import ctx, dag, parallel
+from nukecontexts.matrix import Matrix
+
+
+def build(nuke):
+    grade = nuke.nodes.Grade()
+    other = nuke.nodes.Grade()
+    write = nuke.nodes.Write()
+    write.setInput(0, grade)
+    return grade, other, write
+
+
+def test_upstream(nuke):
+    grade, other, write = build(nuke)
+    assert dag.upstream(write) == set([write, grade])
+    write.setInput(1, other)
+    assert dag.upstream(write) == set([write, grade, other])
+
+
+def test_set_attr_target(nuke):
+    grade, other, write = build(nuke)
+    setter = ctx.AttributeSetter([grade, other], 'disable', True,
+                                 target=write)
+    with setter:
+        assert grade['disable'].value()
+        assert not other['disable'].value()
+        assert setter.pruned == 1
+    assert not grade['disable'].value()
+
+
+def test_matrix_target(nuke):
+    grade, other, write = build(nuke)
+    axis = [ctx.AttributeSetter([grade, other], 'mix', 0.5),
+            ctx.AttributeSetter([grade, other], 'mix', 0.25)]
+    with Matrix([axis], target=write) as variants:
+        for variant in variants:
+            assert grade['mix'].value() == variant.contexts[0].value
+            assert other['mix'].value() == 1.0
+    assert grade['mix'].value() == 1.0
+
+
+def test_describe_prune(nuke):
+    grade, other, write = build(nuke)
+    job = parallel.describe(ctx.AttributeSetter([grade, other], 'mix', 0.5),
+                            write, 1, 1, script='/tmp/test.nk', prune=True)
+    assert job['assignments'] == [[grade.fullName(), 'mix', 0.5]]
+
+
+def test_upstream_groups(nuke):
+    grade, other, write = build(nuke)
+    group = nuke.nodes.Group()
+    with group:
+        inner = nuke.nodes.Grade()
+    write.setInput(0, group)
+    assert dag.upstream(write) == set([write, group, inner])
+    with ctx.set_attr([inner, grade], 'mix', 0.5, target=write):
+        assert inner['mix'].value() == 0.5
+        assert grade['mix'].value() == 1.0
+
+
+def test_upstream_invalidation(nuke):
+    grade, other, write = build(nuke)
+    assert dag.upstream(write) == set([write, grade])
+    assert not nuke.callbacks.knobChangeds
+
+    grade['mix'].setExpression('{0}.mix'.format(other.name()))
+    assert dag.upstream(write) == set([write, grade, other])
+    other['mix'].setValue(0.5)
+    assert dag.get_index().upstream_nodes
+
+
+def test_upstream_headless(fake_nuke, monkeypatch):
+    monkeypatch.setitem(fake_nuke.env, 'gui', False)
+    grade, other, write = build(fake_nuke)
+    assert dag.upstream(write) == set([write, grade])
+    write.setInput(0, other)
+    assert dag.upstream(write) == set([write, other])
+    with ctx.set_attr([grade, other], 'mix', 0.5, target=write):
+        assert grade['mix'].value() == 1.0
+        assert other['mix'].value() == 0.5
@@ -0,0 +1,70 @@
+import pytest
+from nukecontexts import ctx
+from nukecontexts.index import NodeIndex, select
+
+
+@pytest.fixture
+def index():
+    index = NodeIndex()
+    yield index
+    index.close()
+
+
+def test_select(nuke, index):
+    grade = nuke.nodes.Grade(name='grade_fix')
+    other = nuke.nodes.Grade(name='grade_other')
+    write = nuke.nodes.Write(name='write_fix')
+
+    assert select(name='grade_fix', index=index).nodes() == [grade]
+    assert select(cls='Grade', name='*_fix', index=index).nodes() == [grade]
+    assert write in select(name='*_fix', index=index).nodes()
+    assert grade not in select(cls='Write', index=index).nodes()
+    other['mix'].setValue(0.5)
+    assert select(cls='Grade', knobs={'mix': 0.5},
+                  index=index).nodes() == [other]
+    assert select(cls='Grade', index=index,
+                  predicate=lambda node: node.name() == 'grade_other'
+                  ).nodes() == [other]
+
+
+def test_index_callbacks(nuke, index):
+    index.build()
+    grade = nuke.nodes.Grade(name='grade_created')
+    assert index.get('grade_created') is grade
+
+    # Renamed without an open control panel, so without knobChanged
+    grade.setName('grade_renamed')
+    assert select(name='grade_created', index=index).nodes() == []
+    assert select(cls='Grade', name='grade_ren*',
+                  index=index).nodes() == [grade]
+
+    nuke.delete(grade)
+    assert index.get('grade_renamed') is None
+
+    other = nuke.nodes.Grade(name='grade_deleted')
+    other.setName('grade_deleted_renamed')
+    # onDestroy sees a different Python object for the same node
+    nuke.delete(other)
+    assert other not in index.by_name.values()
+    assert select(name='grade_deleted*', index=index).nodes() == []
+    assert other not in index.keys
+    assert select(cls='Grade', name='grade_deleted*',
+                  index=index).nodes() == []
+
+
+def test_index_group_rename(nuke, index):
+    group = nuke.nodes.Group(name='group_old')
+    with group:
+        inner = nuke.nodes.Grade(name='grade_inner')
+    index.build()
+    assert index.get('group_old.grade_inner') == inner
+    group.setName('group_new')
+    assert index.get('group_old.grade_inner') is None
+    assert select(name='group_new.*', index=index).nodes() == [inner]
+
+
+def test_context_selection(nuke, index):
+    grade = nuke.nodes.Grade(name='grade_disable')
+    with ctx.disabled(select(name='grade_disable', index=index)):
+        assert grade['disable'].value()
+    assert not grade['disable'].value()
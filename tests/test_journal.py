@@ -0,0 +1,60 @@
+from nukecontexts import ctx, journal
+
+
+def test_shared(nuke):
+    grades = [nuke.nodes.Grade() for _ in range(3)]
+    shared = journal.get_journal()
+    before = len(shared)
+    outer = ctx.set_attr(grades, 'mix', 0.5)
+    inner = ctx.set_attr(grades[:2], 'disable', True)
+    with outer:
+        with inner:
+            assert len(shared) - before == 5
+            assert len(inner.saved) == 2
+            assert inner.handles == [grade['disable'] for grade in grades[:2]]
+        assert len(shared) - before == 3
+    assert len(shared) == before
+    assert outer.enter_values == dict((grade, 1.0) for grade in grades)
+    assert outer.saved.names == [grade.fullName() for grade in grades]
+    assert outer.handles == []
+
+
+def test_handles(nuke):
+    grades = [nuke.nodes.Grade() for _ in range(3)]
+    grades[1]['mix'].setValue(0.5)
+    context = ctx.set_attr(grades, 'mix', 0.5, skip_unchanged=True)
+    with context:
+        assert context.handles == [grades[0]['mix'], grades[2]['mix']]
+        assert [name for name, _, _ in context.saved] == [
+            grades[0].fullName(), grades[2].fullName()]
+    assert [grade['mix'].value() for grade in grades] == [1.0, 0.5, 1.0]
+
+
+def test_release_out_of_order(nuke):
+    grades = [nuke.nodes.Grade() for _ in range(2)]
+    first = ctx.set_attr(grades, 'mix', 0.5)
+    second = ctx.set_attr(grades, 'disable', True)
+    third = ctx.set_attr(grades[0], 'white', 2.0)
+    first.__enter__()
+    second.__enter__()
+    first.__exit__(None, None, None)
+    third.__enter__()
+    assert [grade['mix'].value() for grade in grades] == [1.0, 1.0]
+    assert [attr for _, attr, _ in second.saved] == ['disable', 'disable']
+    assert [attr for _, attr, _ in third.saved] == ['white']
+    second.__exit__(None, None, None)
+    third.__exit__(None, None, None)
+    assert [grade['disable'].value() for grade in grades] == [False, False]
+    assert grades[0]['white'].value() == 1.0
+
+
+def test_journal():
+    entries = journal.Journal()
+    segment = entries.begin()
+    entries.append('node', 'mix', 1.0)
+    segment.close()
+    entries.append('other', 'mix', 2.0)
+    assert list(segment) == [('node', 'mix', 1.0)]
+    detached = segment.detach()
+    assert list(detached) == [('node', 'mix', 1.0)]
+    assert list(entries) == [('other', 'mix', 2.0)]
@@ -0,0 +1,41 @@
+import pytest
+from nukecontexts import ctx
+from nukecontexts.matrix import Matrix, gray_order
+
+
+def test_gray_order():
+    order = gray_order([2, 3])
+    assert len(order) == 6
+    assert len(set(order)) == 6
+    for previous, current in zip(order, order[1:]):
+        assert sum(a != b for a, b in zip(previous, current)) == 1
+
+
+@pytest.mark.parametrize('order', ['gray', 'nearest'])
+def test_matrix(nuke, node, order):
+    node['file_type'].setValue('exr')
+    node['channels'].setValue('rgb')
+    file_types = [ctx.AttributeSetter(node, 'file_type', 'jpeg'),
+                  ctx.AttributeSetter(node, 'file_type', 'png')]
+    channels = [ctx.AttributeSetter(node, 'channels', 'rgb'),
+                ctx.AttributeSetter(node, 'channels', 'rgba')]
+
+    seen = []
+    matrix = Matrix([file_types, channels], order=order)
+    with matrix as variants:
+        for variant in variants:
+            file_type, channel = variant.contexts
+            assert node['file_type'].value() == file_type.value
+            assert node['channels'].value() == channel.value
+            seen.append(variant.index)
+
+    assert sorted(seen) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    # 1 initial write, 1 per step, 1 restore
+    assert matrix.writes == 5
+    assert node['file_type'].value() == 'exr'
+    assert node['channels'].value() == 'rgb'
+
+
+def test_matrix_invalid_order():
+    with pytest.raises(ValueError):
+        Matrix([], order='random')
@@ -0,0 +1,56 @@
+import json
+import pytest
+from nukecontexts import ctx, metrics
+
+
+@pytest.fixture
+def sink():
+    sink = metrics.add_sink(metrics.MemorySink())
+    yield sink
+    metrics.remove_sink(sink)
+
+
+def test_attribute_setter_timings(node, sink):
+    with ctx.AttributeSetter(node, 'disable', True):
+        pass
+    names = dict((entry['name'], entry) for entry in sink.summary())
+    assert names['context_enter']['labels'] == {'context': 'AttributeSetter',
+                                                'nodes': 1,
+                                                'knobs': 1}
+    assert names['context_exit']['count'] == 1
+    assert names['set_value']['count'] == 2
+    assert names['set_value']['labels'] == {'knob': 'disable'}
+
+
+def test_hook(node):
+    recorded = []
+
+    def hook(name, seconds, labels):
+        recorded.append(name)
+
+    metrics.add_sink(hook)
+    try:
+        with ctx.inventory():
+            pass
+    finally:
+        metrics.remove_sink(hook)
+    assert recorded == ['inventory_enter', 'inventory_exit']
+    assert not metrics.enabled()
+
+
+def test_exporters(tmpdir):
+    jsonl = metrics.JsonlSink(str(tmpdir.join('metrics.jsonl')))
+    jsonl.record('context_enter', 0.5, {'knobs': 2})
+    line = json.loads(tmpdir.join('metrics.jsonl').read())
+    assert line['seconds'] == 0.5
+    assert line['labels'] == {'knobs': 2}
+
+    path = tmpdir.join('metrics.prom')
+    prometheus = metrics.PrometheusTextfileSink(str(path))
+    prometheus.record('context_enter', 0.5, {'knobs': 2})
+    prometheus.flush()
+    text = path.read()
+    assert '# TYPE nukecontexts_context_enter_seconds histogram' in text
+    assert 'nukecontexts_context_enter_seconds_bucket{knobs="2",le="1.0"} 1' \
+        in text
+    assert 'nukecontexts_context_enter_seconds_count{knobs="2"} 1' in text
@@ -0,0 +1,59 @@
+import sys
+import json
+import pytest
+from nukecontexts import ctx, parallel
+
+STAND_IN = '''
+import sys
+import json
+
+with open(sys.argv[1]) as f:
+    job = json.load(f)
+if job['write'] == 'fail':
+    sys.exit(1)
+print(json.dumps(job['assignments']))
+'''
+
+
+@pytest.fixture
+def stand_in(tmpdir):
+    worker = tmpdir.join('worker.py')
+    worker.write(STAND_IN)
+    return str(worker)
+
+
+def test_describe(node):
+    job = parallel.describe([ctx.AttributeSetter(node, 'file_type', 'jpeg'),
+                             ctx.AttributeSetter(node, 'disable', True)],
+                            node, 1, 10, script='/tmp/test.nk')
+    assert job == {'script': '/tmp/test.nk',
+                   'write': node.fullName(),
+                   'first': 1,
+                   'last': 10,
+                   'assignments': [[node.fullName(), 'file_type', 'jpeg'],
+                                   [node.fullName(), 'disable', True]]}
+    with pytest.raises(ctx.NukeContextError):
+        parallel.describe(ctx.AttributeSetter(None, 'disable', True),
+                          node, 1, 10, script='/tmp/test.nk')
+
+
+def test_render(node, stand_in):
+    file_types = ['exr', 'jpeg', 'png', 'tiff']
+    jobs = [parallel.describe(ctx.AttributeSetter(node, 'file_type', value),
+                              node, 1, 1, script='/tmp/test.nk')
+            for value in file_types]
+    results = parallel.render(jobs, workers=2, executable=[sys.executable],
+                              worker=stand_in)
+    assert [result.job for result in results] == jobs
+    for value, result in zip(file_types, results):
+        assert result.returncode == 0
+        assert json.loads(result.output) == [[node.fullName(), 'file_type',
+                                              value]]
+
+
+def test_render_failure(node, stand_in):
+    jobs = [parallel.describe([], 'fail', 1, 1, script='/tmp/test.nk'),
+            parallel.describe([], node, 1, 1, script='/tmp/test.nk')]
+    with pytest.raises(parallel.RenderError) as err:
+        parallel.render(jobs, executable=[sys.executable], worker=stand_in)
+    assert [result.returncode for result in err.value.results] == [1, 0]
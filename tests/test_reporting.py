@@ -0,0 +1,102 @@
+import sys
+import types
+import threading
+import pytest
+import nukecontexts
+from nukecontexts import ctx, reporting
+
+
+@pytest.fixture
+def events(monkeypatch):
+    events = []
+    reporter = reporting.Reporter(events.append)
+    monkeypatch.setattr(reporting, '_reporter', reporter)
+    yield events
+    reporter.close()
+
+
+def test_context_errors(node, events):
+    with pytest.raises(ctx.NukeContextError):
+        ctx.set_attr(node, 'invalid_attr', True)
+    reporter = reporting.get_reporter()
+    assert reporter.flush(5.0)
+    assert len(events) == 1
+    assert events[0]['exception'] == 'NukeContextError'
+    assert events[0]['tags'] == {'context': 'AttributeSetter',
+                                 'phase': 'lookup', 'knobs': 1}
+    assert 'invalid_attr' in events[0]['traceback']
+    assert reporter.stats['sent'] == 1
+
+
+def test_backpressure(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    sent = []
+
+    def transport(event):
+        started.set()
+        release.wait(5.0)
+        sent.append(event['message'])
+
+    reporter = reporting.Reporter(transport, max_queue=1)
+    monkeypatch.setattr(reporting, '_reporter', reporter)
+    assert reporting.report(message='first')
+    assert started.wait(5.0)
+    assert reporting.report(message='second')
+    assert not reporting.report(message='third')
+    assert not reporter.flush()
+    release.set()
+    assert reporter.flush(5.0)
+    reporter.close()
+    assert sent == ['first', 'second']
+    assert reporter.stats == {'queued': 2, 'sent': 2, 'dropped': 1,
+                              'failed': 0}
+
+
+def test_no_reporter(monkeypatch):
+    monkeypatch.setattr(reporting, '_reporter', None)
+    assert not reporting.report(message='ignored')
+
+
+def test_lazy_sentry(monkeypatch):
+    threads = []
+    messages = []
+
+    class Client(object):
+        def __init__(self, release):
+            threads.append(threading.current_thread().name)
+
+        def user_context(self, context):
+            pass
+
+        def tags_context(self, context):
+            pass
+
+        def captureMessage(self, message, tags):
+            messages.append(message)
+
+    raven = types.ModuleType('raven')
+    raven.Client = Client
+    monkeypatch.setitem(sys.modules, 'raven', raven)
+    monkeypatch.setenv('SENTRY_DSN', 'https://key@sentry.invalid/1')
+    monkeypatch.setattr(nukecontexts, 'sentry', None)
+    monkeypatch.setattr(reporting, 'find_spec', lambda name: object())
+    monkeypatch.setattr(reporting, '_reporter', reporting._UNSET)
+    reporter = reporting.get_reporter()
+    try:
+        assert threads == []
+        assert reporting.report(message='first')
+        assert reporting.report(message='second')
+        assert reporter.flush(5.0)
+    finally:
+        reporter.close()
+    assert threads == ['nukecontexts-reporter']
+    assert messages == ['first', 'second']
+    assert nukecontexts.get_sentry() is reporter.transport.client
+
+
+def test_no_raven(monkeypatch):
+    monkeypatch.setenv('SENTRY_DSN', 'https://key@sentry.invalid/1')
+    monkeypatch.setattr(reporting, 'find_spec', lambda name: None)
+    monkeypatch.setattr(reporting, '_reporter', reporting._UNSET)
+    assert reporting.get_reporter() is None
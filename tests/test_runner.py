@@ -0,0 +1,88 @@
+import json
+import pytest
+from nukecontexts import runner
+
+
+@pytest.fixture(scope='module')
+def script(nuke, tmpdir_factory):
+    tmpdir = tmpdir_factory.mktemp('runner')
+    grade = nuke.nodes.Grade(name='runner_grade')
+    write = nuke.nodes.Write(name='runner_write')
+    write.setInput(0, grade)
+    path = tmpdir.join('script.nk')
+    path.write('# script')
+    return str(path)
+
+
+def write_spec(tmpdir, values, shared=False):
+    def output(value):
+        name = 'out' if shared else 'out_{0}'.format(value)
+        return str(tmpdir.join('{0}.####.exr'.format(name)))
+
+    path = tmpdir.join('spec.json')
+    path.write(json.dumps({
+        'write': 'runner_write',
+        'frames': [1, 2],
+        'axes': [{'name': 'mix',
+                  'values': [{'label': str(value),
+                              'set': {'runner_grade': {'mix': value},
+                                      'runner_write': {'file': output(value)}}}
+                             for value in values]}]}))
+    return str(path)
+
+
+@pytest.mark.usefixtures('fake_nuke')
+def test_main(nuke, script, tmpdir):
+    spec_path = write_spec(tmpdir, [0.25, 0.5])
+    report_path = str(tmpdir.join('report.json'))
+    del nuke.executed[:]
+    assert runner.main([script, spec_path, '--report', report_path]) == 0
+    with open(report_path) as f:
+        report = json.load(f)
+    assert [(entry['variant'], entry['status'])
+            for entry in report['variants']] == [('0.25', 'rendered'),
+                                                 ('0.5', 'rendered')]
+    assert len(report['variants'][0]['files']) == 2
+    assert len(nuke.executed) == 2
+
+    assert runner.main([script, spec_path, '--report', report_path,
+                        '--resume', '--cache-dir',
+                        str(tmpdir.join('plans'))]) == 0
+    with open(report_path) as f:
+        report = json.load(f)
+    assert [entry['status'] for entry in report['variants']] == \
+        ['skipped', 'skipped']
+    assert len(nuke.executed) == 2
+
+
+def test_shared_outputs(nuke, script, tmpdir):
+    report_path = str(tmpdir.join('report.json'))
+    assert runner.main([script, write_spec(tmpdir, [0.25, 0.5], shared=True),
+                        '--report', report_path]) == 1
+    with open(report_path) as f:
+        report = json.load(f)
+    assert [entry['status'] for entry in report['variants']] == \
+        ['rendered', 'failed']
+    assert report['variants'][1]['error'] == \
+        'Output files shared with variant 0.25'
+
+
+def test_main_failure(nuke, script, tmpdir, monkeypatch):
+    report_path = str(tmpdir.join('report.json'))
+    assert runner.main([script, write_spec(tmpdir, [0.5, 'full']),
+                        '--report', report_path]) == 1
+    with open(report_path) as f:
+        report = json.load(f)
+    assert report['variants'] == []
+    assert 'full' in report['error']
+
+    def fail(name, first, last, incr=1):
+        raise RuntimeError('Render failed')
+
+    monkeypatch.setattr(nuke, 'execute', fail)
+    assert runner.main([script, write_spec(tmpdir, [0.5]),
+                        '--report', report_path]) == 1
+    with open(report_path) as f:
+        entry = json.load(f)['variants'][0]
+    assert entry['status'] == 'failed'
+    assert entry['error'] == 'Render failed'
@@ -0,0 +1,33 @@
+from nukecontexts import ctx
+from nukecontexts.snapshot import Snapshot
+
+
+def test_snapshot(node):
+    node['file_type'].setValue('exr')
+    snapshot = Snapshot.capture(node)
+    assert len(snapshot) == 1
+
+    node['file_type'].setValue('jpeg')
+    changed = Snapshot.capture(node)
+    assert snapshot.diff(changed) == [node]
+
+    snapshot.restore()
+    assert node['file_type'].value() == 'exr'
+    assert snapshot.diff(Snapshot.capture(node)) == []
+
+    loaded = Snapshot.loads(snapshot.dumps())
+    assert loaded.states == snapshot.states
+
+
+def test_preserved(node):
+    node['file_type'].setValue('exr')
+    with ctx.preserved([node]):
+        node['file_type'].setValue('png')
+    assert node['file_type'].value() == 'exr'
+
+
+def test_set_attr_snapshot(node):
+    node['file_type'].setValue('exr')
+    with ctx.set_attr(node, 'file_type', 'jpeg', snapshot=True):
+        assert node['file_type'].value() == 'jpeg'
+    assert node['file_type'].value() == 'exr'
@@ -0,0 +1,74 @@
+import json
+import shutil
+import pytest
+from nukecontexts import ctx, spec
+
+
+@pytest.fixture(scope='module')
+def script(nuke, tmpdir_factory):
+    grades = [nuke.nodes.Grade(name='spec_grade_{0}'.format(i))
+              for i in range(2)]
+    write = nuke.nodes.Write(name='spec_write')
+    write.setInput(0, grades[0])
+    path = tmpdir_factory.mktemp('spec').join('script.nk')
+    path.write('# script')
+    return str(path)
+
+
+SPEC = {'write': 'spec_write',
+        'frames': [1, 10],
+        'target': 'spec_write',
+        'nodes': {'grades': {'class': 'Grade', 'name': 'spec_grade_*'}},
+        'set': {'@grades': {'mix': 0.5}},
+        'axes': [{'name': 'format',
+                  'values': [{'label': 'exr',
+                              'set': {'spec_write': {'file_type': 'exr'}}},
+                             {'label': 'jpeg',
+                              'set': {'spec_write': {'file_type': 'jpeg'}}}]},
+                 {'name': 'white',
+                  'values': [{'set': {'@grades': {'white': 1.0}}},
+                             {'set': {'@grades': {'white': 2.0}}}]}]}
+
+
+def test_load(tmpdir):
+    path = tmpdir.join('spec.json')
+    path.write(json.dumps(SPEC))
+    assert spec.load(str(path)) == SPEC
+    for invalid in [{'frames': [1, 10]},
+                    {'write': 'spec_write', 'frames': [10, 1]},
+                    {'write': 'spec_write', 'frames': [1, 10], 'axis': []},
+                    {'write': 'spec_write', 'frames': [1, 10],
+                     'axes': [{'values': [{'spec_write': {}}]}]}]:
+        with pytest.raises(ctx.NukeContextError):
+            spec.validate(invalid)
+
+
+def test_resolve(script):
+    jobs = spec.resolve(SPEC, script)
+    assert [job['variant'] for job in jobs] == ['exr_white0', 'exr_white1',
+                                                'jpeg_white1', 'jpeg_white0']
+    # spec_grade_1 isn't upstream of the target
+    assert jobs[0]['assignments'] == [['spec_grade_0', 'mix', 0.5],
+                                      ['spec_write', 'file_type', 'exr'],
+                                      ['spec_grade_0', 'white', 1.0]]
+    with pytest.raises(ctx.NukeContextError):
+        spec.resolve(dict(SPEC, set={'missing': {'mix': 0.5}}), script)
+    with pytest.raises(ctx.NukeContextError):
+        spec.resolve(dict(SPEC, set={'@grades': {'mix': 'full'}}), script)
+
+
+def test_compile_plan(script, tmpdir, monkeypatch):
+    cache_dir = str(tmpdir.join('plans'))
+    jobs = spec.compile_plan(SPEC, script, cache_dir=cache_dir)
+    monkeypatch.setattr(spec, 'resolve', None)
+    assert spec.compile_plan(SPEC, script, cache_dir=cache_dir) == jobs
+
+    copy = str(tmpdir.join('copy.nk'))
+    shutil.copy(script, copy)
+    copied = spec.compile_plan(SPEC, copy, cache_dir=cache_dir)
+    assert [job['script'] for job in copied] == [copy] * len(jobs)
+
+    grade = spec.nuke.toNode('spec_grade_0')
+    with spec.context(jobs[1]):
+        assert grade['white'].value() == 2.0
+    assert grade['white'].value() == 1.0
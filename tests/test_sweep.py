@@ -0,0 +1,51 @@
+import pytest
+from nukecontexts import ctx, sweep
+
+
+def test_requires_numpy(nuke, monkeypatch):
+    monkeypatch.setattr(sweep, 'numpy', None)
+    with pytest.raises(ctx.NukeContextError):
+        sweep.Sweep(nuke.nodes.Grade(), 'mix', [0.5])
+
+
+def test_values():
+    numpy = pytest.importorskip('numpy')
+    values = sweep.linspace([1.0, 1.0], [2.0, 1.0], 3)
+    assert values.tolist() == [[1.0, 1.0], [1.5, 1.0], [2.0, 1.0]]
+    assert sweep.grid([0, 1], [0, 10, 20]).shape == (6, 2)
+    assert sweep.grid([0, 1], [0, 10, 20])[1].tolist() == [0.0, 10.0]
+    values = sweep.random([0.0, 0.0], [1.0, 2.0], 100, seed=1)
+    assert values.shape == (100, 2)
+    assert numpy.all(values[:, 1] < 2.0)
+    assert (sweep.random(0, 1, 5, seed=1) == sweep.random(0, 1, 5,
+                                                          seed=1)).all()
+
+
+def test_sweep(nuke):
+    pytest.importorskip('numpy')
+    grades = [nuke.nodes.Grade() for _ in range(2)]
+    values = sweep.linspace([1.0, 1.0, 1.0, 1.0], [2.0, 2.0, 1.0, 1.0], 5)
+    seen = []
+    context = sweep.Sweep(grades, 'white', values)
+    with context as steps:
+        for step in steps:
+            seen.append([grade['white'].value() for grade in grades])
+    assert seen[-1] == [[2.0, 2.0, 1.0, 1.0]] * 2
+    assert [grade['white'].value() for grade in grades] == [1.0, 1.0]
+    assert context.writes == 5 * 2 + 2
+
+
+def test_sweep_per_node(nuke):
+    numpy = pytest.importorskip('numpy')
+    grades = [nuke.nodes.Grade() for _ in range(2)]
+    values = numpy.array([[0.1, 0.2], [0.1, 0.4]])
+    context = sweep.Sweep(grades, 'mix', values, per_node=True)
+    with context as steps:
+        for step in steps:
+            assert [grade['mix'].value() for grade in grades] == step.value
+    # The first node's value doesn't change in the second step
+    assert context.writes == 3 + 2
+    with pytest.raises(ctx.NukeContextError):
+        sweep.Sweep(grades, 'mix', values[:, :1], per_node=True)
+    with pytest.raises(ctx.NukeContextError):
+        sweep.Sweep(grades, 'mix', numpy.array(['a', 'b']))